@@ -1,77 +1,187 @@
 # ========================================
-# COUNTRY GUESSER 3D GLOBE VERSION (Prototype)
+# COUNTRY GUESSER 3D GLOBE VERSION
 # ========================================
+# Same data layer as project.py: countries from the catalog snapshot
+# (catalog.py), outlines and rows from the world artifact (geo.py),
+# country-to-country distances from the precomputed matrices (matrices.py).
+# Guess by typing a name (fuzzy, see name_index.py) or by clicking a country
+# on the globe.
 
+import os
+import secrets
 import streamlit as st
 import pydeck as pdk
-import random
+import catalog
+import events
+import metrics
+from engine import Game
+from geo import load_locator
+from matrices import load_matrix
+
+metrics.begin_run()
 
 # Streamlit Page Setup
 st.set_page_config(page_title="🌍 Country Guesser 3D", layout="wide")
 
-# --- Country Data (Simplified) ---
-countries = [
-    {"name": "United States", "lat": 38.0, "lon": -97.0},
-    {"name": "Germany", "lat": 51.0, "lon": 10.0},
-    {"name": "Brazil", "lat": -14.0, "lon": -51.0},
-    {"name": "Australia", "lat": -25.0, "lon": 133.0},
-    {"name": "India", "lat": 21.0, "lon": 78.0},
-]
+GLOBE_TOLERANCE = 0.25  # simplification level drawn on the globe (degrees)
+
+# ==================== Shared Geo Data ====================
+@st.cache_resource
+def load_globe_data():
+    # Locator rows = matrix rows = feature order of the globe layer
+    with metrics.timer("load_world_geodata"):
+        locator = load_locator()
+        return locator, load_matrix(locator=locator)
+
+locator, matrix = load_globe_data()
+
+def load_outline_url():
+    # The outlines as one GeoJSON document the browser fetches once instead
+    # of getting it inline in the chart spec of every rerun, if CG_TILE_URL
+    # names a tile endpoint it can reach (tiles.py serves /world.geojson
+    # next to /tiles/). Unset: inline data, a server on this machine's
+    # localhost is out of reach for remote browsers.
+    url = os.environ.get("CG_TILE_URL")
+    return url.split("/tiles/")[0] + "/world.geojson" if url else None
+
+@st.cache_resource
+def countries_layer():
+    # All ~177 outlines in one static layer, built once per process and
+    # identical on every rerun; picking a feature gives its locator row
+    return pdk.Layer(
+        "GeoJsonLayer",
+        id="countries",
+        data=load_outline_url() or locator.world_geojson(GLOBE_TOLERANCE),
+        get_fill_color=[90, 140, 90, 200],
+        get_line_color=[255, 255, 255, 160],
+        line_width_min_pixels=1,
+        stroked=True,
+        filled=True,
+        pickable=True,
+        auto_highlight=True,
+        highlight_color=[255, 255, 255, 90],
+    )
+
+def marked_layer(layer_id, rows, color):
+    # Subset of the outlines (guessed countries, solution) drawn on top
+    features = locator.world_geojson(GLOBE_TOLERANCE)["features"]
+    return pdk.Layer(
+        "GeoJsonLayer",
+        id=layer_id,
+        data={"type": "FeatureCollection", "features": [features[r] for r in rows]},
+        get_fill_color=color,
+        get_line_color=[255, 255, 255, 220],
+        line_width_min_pixels=1,
+        pickable=False,
+    )
+
+# ==================== Game ====================
+@st.cache_resource
+def load_event_log():
+    # Game events for analytics.py, as in project.py (events.py)
+    return events.open_log()
+
+def start_game():
+    # Every catalog country that has an outline on the globe
+    countries = catalog.countries()
+    ids = [i for i, c in enumerate(countries) if locator.row(c["name"]["common"]) is not None]
+    log = load_event_log()
+    sink = log.sink(sid=secrets.token_urlsafe(16), mode="globe") if log else None
+    st.session_state.globe_game = Game(["You"], float("inf"), countries, ids=ids,
+                                       code_to_name=catalog.code_to_name(), events=sink)
+    st.session_state.globe_picked = []
+
+if "globe_game" not in st.session_state:
+    start_game()
+
+game = st.session_state.globe_game
+target_row = locator.row(game.country["name"]["common"])
 
-# Select a random target country
-if "target_country" not in st.session_state:
-    st.session_state.target_country = random.choice(countries)
+def evaluate_pick(row):
+    # Globe clicks arrive as picked features, i.e. locator rows: the hit
+    # test is the pick itself, the distance a matrix lookup
+    inside = row == target_row
+    dist = None if inside else matrix.distance(row, target_row)
+    lat, lon = locator.centroids[row]
+    game.score_click(float(lat), float(lon), inside, dist)
+    st.session_state.globe_picked.append(row)
 
-target = st.session_state.target_country
+def next_round():
+    game.new_round()
+    st.session_state.globe_picked = []
 
 # --- Sidebar: Guess Form ---
 with st.sidebar:
     st.title("🌍 Country Guesser 3D")
-    guess = st.text_input("Your guess for the country name:")
-    if st.button("Submit Guess"):
-        if guess.lower().strip() == target["name"].lower():
-            st.success(f"✅ Correct! It was {target['name']} 🎉")
-            # Reset for new round
-            st.session_state.target_country = random.choice(countries)
+    st.markdown(f"**Score:** {game.get_current_player().score} · **Round:** {game.round_number}")
+
+    if not game.round_over:
+        # New key per attempt, so a wrong guess clears the field
+        guess = st.text_input("Your guess for the country name:", key=f"guess_{game.round_number}_{game.guess_count}")
+        names = catalog.name_index()
+        # Suggestions from the name index; picking one submits it
+        suggestions = [n for _, n in names.complete(guess, limit=5)] if guess.strip() else []
+        picked = st.pills("Suggestions", suggestions, key=f"pills_{game.round_number}_{game.guess_count}") \
+            if suggestions else None
+        if (st.button("Submit Guess") and guess.strip()) or picked:
+            # ids index the snapshot the game started on
+            game.process_guess(picked or guess, names if game.countries is catalog.countries() else None)
+            metrics.end_run()
+            st.rerun()
+
+    if game.message:
+        if game.message.startswith("❌") and game.round_over:
+            st.error(game.message)
+        elif game.message.startswith("❌"):
+            st.warning(game.message)
         else:
-            st.error(f"❌ Wrong! Try again!")
+            st.success(game.message)
+
+    if game.round_over:
+        st.button("➡️ Next Round", on_click=next_round)
 
     st.write("---")
-    st.write(f"Hint: It is located around latitude {target['lat']}°, longitude {target['lon']}°.")
+    for i in range(1, game.hint_index + 1):
+        h = game.get_hint(i)
+        if h.startswith("http"):
+            st.write(f"**Hint {i}: Flag**")
+            st.image(h, width=120)
+        else:
+            st.markdown(f"**Hint {i}:** {h}")
 
 # --- Main Area: 3D Globe Map ---
+layers = [countries_layer()]
+if st.session_state.globe_picked:
+    layers.append(marked_layer("guessed", st.session_state.globe_picked, [200, 30, 0, 220]))
+if game.round_over and target_row is not None:
+    layers.append(marked_layer("solution", [target_row], [40, 200, 60, 230]))
+    lat, lon = locator.centroids[target_row]
+    view_state = pdk.ViewState(latitude=float(lat), longitude=float(lon), zoom=1.5)
+else:
+    view_state = pdk.ViewState(latitude=20, longitude=0, zoom=0.5, min_zoom=0, max_zoom=5)
 
-# Create a layer for all country "centroids"
-layer = pdk.Layer(
-    "ScatterplotLayer",
-    data=countries,
-    get_position="[lon, lat]",
-    get_color="[200, 30, 0, 160]",
-    get_radius=500000,
-    pickable=True,
-)
-
-# View settings
-view_state = pdk.ViewState(
-    latitude=0,
-    longitude=0,
-    zoom=0.5,
-    min_zoom=0,
-    max_zoom=5,
-    pitch=30,
-    bearing=0
-)
-
-# Create 3D Deck
 deck = pdk.Deck(
-    layers=[layer],
+    layers=layers,
+    views=[pdk.View(type="_GlobeView", controller=True)],
     initial_view_state=view_state,
-    tooltip={"text": "{name}"},
+    tooltip=False,  # names would give the answer away
+    map_provider=None,
     map_style=None,
-    globe=True,  # Enable 3D Globe 🌍
 )
 
-st.pydeck_chart(deck)
+# One chart per round: picks of the round stay in its selection state
+with metrics.timer("pydeck_chart"):
+    event = st.pydeck_chart(deck, height=650, on_select="rerun", selection_mode="single-object",
+                            key=f"globe_{game.round_number}")
+
+picked_rows = event.selection["indices"].get("countries", []) if event else []
+if picked_rows and not game.round_over and picked_rows[0] not in st.session_state.globe_picked:
+    with metrics.timer("evaluate_pick"):
+        evaluate_pick(picked_rows[0])
+    metrics.end_run()  # st.rerun() ends the run by raising
+    st.rerun()
 
 # Instruction
-st.info("🎲 Rotate and zoom the globe. Try guessing the target country based on hints!")
+st.info("🎲 Rotate and zoom the globe. Click the country you think it is, or type its name!")
+
+metrics.end_run()
@@ -0,0 +1,59 @@
+# ==================== Admin Page ====================
+# Timing dashboard over metrics.REGISTRY. Not linked anywhere: project.py
+# shows it instead of the game for ?admin=<CG_ADMIN_TOKEN>.
+
+import numpy as np
+import streamlit as st
+
+import metrics
+
+
+def display_admin(registry=metrics.REGISTRY):
+    st.title("⏱️ Timings")
+    hist = registry.histograms()
+    if not hist:
+        st.write("Nothing recorded yet in this process.")
+        return
+
+    # Per section: totals from the histograms, percentiles from the recent events
+    recent = {}
+    for _, _, section, seconds in registry.recent():
+        recent.setdefault(section, []).append(seconds)
+    rows = []
+    for section, h in hist.items():
+        samples = np.array(recent.get(section, [0.0])) * 1000
+        p50, p95 = np.percentile(samples, [50, 95])
+        rows.append({
+            "Section": section,
+            "Calls": h["count"],
+            "Mean ms": round(h["sum"] / h["count"] * 1000, 2),
+            "p50 ms": round(p50, 2),
+            "p95 ms": round(p95, 2),
+            "Max ms": round(samples.max(), 2),
+            "Total s": round(h["sum"], 2),
+        })
+    st.dataframe(sorted(rows, key=lambda r: r["Total s"], reverse=True), hide_index=True)
+
+    # Last reruns, stacked by section (nested sections overlap their parent)
+    runs = registry.runs(50)
+    if runs:
+        st.subheader("Recent reruns")
+        sections = sorted({s for _, secs in runs for s in secs if s != "rerun"})
+        chart = {"run": [str(run) for run, _ in runs]}
+        for s in sections:
+            chart[s] = [secs.get(s, 0.0) * 1000 for _, secs in runs]
+        st.bar_chart(chart, x="run", y=sections, y_label="ms", sort=False)
+
+    st.subheader("Histograms")
+    section = st.selectbox("Section", list(hist))
+    h = hist[section]
+    counts = np.diff([0] + [c for _, c in h["buckets"]])
+    st.bar_chart({"le (s)": [str(le) for le, _ in h["buckets"]], "calls": counts.tolist()},
+                 x="le (s)", y="calls", sort=False)
+
+    c1, c2, c3 = st.columns(3)
+    c1.download_button("Prometheus text", registry.to_prometheus(), "metrics.txt", "text/plain")
+    c2.download_button("JSON", registry.to_json(), "metrics.json", "application/json")
+    if c3.button("Reset"):
+        registry.reset()
+        st.rerun()
@@ -0,0 +1,128 @@
+# ==================== Event Analytics ====================
+# One streaming pass over the event log (events.py): memory grows with the
+# number of countries and hint levels, not with the size of the log.
+#
+#   python analytics.py report [--since YYYY-MM-DD] [--min-rounds N]
+#   python analytics.py retier [--since YYYY-MM-DD] [--min-rounds N] [--write]
+#
+# Per country: rounds finished, solve rate, average points, difficulty
+# (share of the possible points lost) and average distance error of wrong
+# clicks. Per hint level: how often a guess made with that many hints shown
+# was right. `retier` re-sorts the countries of difficulty.py's tiers by
+# measured difficulty; --write stores the result in data/difficulty_tiers.json,
+# which difficulty.py then uses instead of the manual lists.
+
+import argparse
+import json
+import os
+
+import catalog
+from difficulty import TIERS, TIERS_PATH, difficulty_lists
+from engine import MAX_HINTS
+from events import EVENT_DIR, event_files, read_events
+
+
+class CountryStats:
+    __slots__ = ("rounds", "solved", "points", "wrong", "km_sum", "km_count")
+
+    def __init__(self):
+        self.rounds = self.solved = self.points = self.wrong = self.km_count = 0
+        self.km_sum = 0.0
+
+    @property
+    def difficulty(self):
+        # 0 = always solved with full points, 1 = never solved
+        return 1.0 - self.points / (self.rounds * MAX_HINTS) if self.rounds else None
+
+    @property
+    def avg_km(self):
+        return self.km_sum / self.km_count if self.km_count else None
+
+
+def aggregate(events):
+    # -> ({country code: CountryStats}, {hints shown: [guesses, right]})
+    countries, hints = {}, {}
+    for e in events:
+        kind, code = e.get("k"), e.get("country")
+        if kind == "guess":
+            h = hints.setdefault(e.get("hint"), [0, 0])
+            h[0] += 1
+            h[1] += bool(e.get("ok"))
+            if not e.get("ok") and e.get("km") is not None:
+                s = countries.setdefault(code, CountryStats())
+                s.km_sum += e["km"]
+                s.km_count += 1
+        elif kind == "outcome":
+            s = countries.setdefault(code, CountryStats())
+            s.rounds += 1
+            s.solved += e.get("result") != "miss"
+            s.points += e.get("points", 0)
+            s.wrong += e.get("wrong", 0)
+    return countries, hints
+
+
+def retier(countries, difficulty_lists, name_to_code, min_rounds=20):
+    # New Easy/Medium/Hard lists of the same sizes: countries with at least
+    # `min_rounds` finished rounds are ranked by measured difficulty and
+    # dealt out easiest first; the others stay in their current tier
+    def stats(name):
+        s = countries.get(name_to_code.get(name))
+        return s if s is not None and s.rounds >= min_rounds else None
+
+    names = [n for tier in TIERS for n in difficulty_lists.get(tier, [])]
+    ranked = [n for _, n in sorted((stats(n).difficulty, n) for n in names if stats(n))]
+    measured = set(ranked)
+    new, k = {}, 0
+    for tier in TIERS:
+        keep = [n for n in difficulty_lists.get(tier, []) if n not in measured]
+        take = len(difficulty_lists.get(tier, [])) - len(keep)
+        new[tier] = keep + ranked[k:k + take]
+        k += take
+    return new
+
+
+# ==================== CLI ====================
+def _report(countries, hints, code_to_name, min_rounds):
+    rows = sorted(((s.difficulty, code, s) for code, s in countries.items() if s.rounds >= min_rounds),
+                  key=lambda r: r[0], reverse=True)
+    print(f"{'country':28s} {'rounds':>7s} {'solved':>7s} {'avg pts':>8s} {'difficulty':>10s} {'avg km off':>10s}")
+    for difficulty, code, s in rows:
+        km = f"{s.avg_km:10,.0f}" if s.avg_km is not None else f"{'-':>10s}"
+        print(f"{code_to_name.get(code, code)[:28]:28s} {s.rounds:7d} {s.solved / s.rounds:7.0%} "
+              f"{s.points / s.rounds:8.2f} {difficulty:10.2f} {km}")
+    print()
+    print(f"{'hints shown':>11s} {'guesses':>8s} {'right':>6s}")
+    for k in sorted(h for h in hints if h is not None):
+        n, right = hints[k]
+        print(f"{k:11d} {n:8d} {right / n:6.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Country Guesser event analytics")
+    parser.add_argument("command", choices=["report", "retier"])
+    parser.add_argument("--dir", default=EVENT_DIR, help="event log directory")
+    parser.add_argument("--since", help="first day to include (YYYY-MM-DD)")
+    parser.add_argument("--min-rounds", type=int, default=20, help="rounds needed to rank a country")
+    parser.add_argument("--write", action="store_true", help=f"store the new tiers in {TIERS_PATH}")
+    args = parser.parse_args()
+
+    countries, hints = aggregate(read_events(event_files(args.dir, args.since)))
+    code_to_name = catalog.code_to_name()
+    if args.command == "report":
+        _report(countries, hints, code_to_name, args.min_rounds)
+        return
+
+    tiers = retier(countries, difficulty_lists, {n: c for c, n in code_to_name.items()}, args.min_rounds)
+    for tier in TIERS:
+        moved = [n for n in tiers[tier] if n not in difficulty_lists[tier]]
+        print(f"{tier}: {len(tiers[tier])} countries, moved in: {', '.join(moved) or '-'}")
+    if args.write:
+        tmp = f"{TIERS_PATH}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(tiers, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, TIERS_PATH)
+        print(f"Wrote {TIERS_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,542 @@
+# ==================== Benchmarks ====================
+# Micro-benchmarks for the game's hot paths.
+# Usage:  python bench.py <name> [--n N]
+#         python bench.py all
+#         python bench.py pipeline [--stream clicks.csv] [--save-baseline | --check]
+
+import argparse
+import csv
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+VINCENTY_TOLERANCE_KM = 1e-6  # 1 mm against geopy's Karney solution
+
+
+def _timeit(fn, repeat=5, number=1):
+    # best-of-`repeat` seconds per call
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - t0) / number)
+    return best
+
+
+def _random_points(n, seed=0):
+    rng = np.random.default_rng(seed)
+    lats = np.degrees(np.arcsin(rng.uniform(-1, 1, n)))
+    lons = rng.uniform(-180, 180, n)
+    return lats, lons
+
+
+# ---------- distance ----------
+def bench_distance(args):
+    from geopy.distance import geodesic
+    import distance
+
+    # Accuracy against geopy (Karney) on random pairs, incl. near-antipodal ones
+    lats, lons = _random_points(args.n)
+    tlats, tlons = _random_points(args.n, seed=1)
+    tlats[:20], tlons[:20] = -lats[:20], lons[:20] + 179.9
+    ref = np.array([geodesic((a, b), (c, d)).km for a, b, c, d in zip(lats, lons, tlats, tlons)])
+    for name, fn in (("vincenty", distance.vincenty_km), ("haversine", distance.haversine_km)):
+        err = np.abs(fn(lats, lons, tlats, tlons) - ref)
+        print(f"{name:10s} max abs err vs geopy: {err.max():.7f} km (mean {err.mean():.7f})")
+        if name == "vincenty" and err.max() >= VINCENTY_TOLERANCE_KM:
+            print(f"ACCURACY vincenty: {err.max() * 1e6:.3f} mm >= {VINCENTY_TOLERANCE_KM * 1e6:.0f} mm")
+            sys.exit(1)
+
+    # Per-rerun cost of the "previous attempts" panel (5 guesses vs one target)
+    g_lats, g_lons = lats[:5], lons[:5]
+    target = (tlats[-1], tlons[-1])
+    old = _timeit(lambda: [geodesic((a, b), target).km for a, b in zip(g_lats, g_lons)], number=200)
+    new = _timeit(lambda: distance.geodesic_km(g_lats, g_lons, *target), number=200)
+    print(f"attempts panel (5 guesses): geopy {old * 1e6:.1f} us -> numpy {new * 1e6:.1f} us ({old / new:.1f}x)")
+
+    bulk = _timeit(lambda: distance.geodesic_km(lats, lons, tlats, tlons))
+    print(f"bulk vincenty: {args.n / bulk:,.0f} pairs/s")
+
+    # Country-to-country lookup from the memory-mapped matrices
+    import geo
+    import matrices
+
+    locator = geo.load_locator()
+    m = matrices.load_matrix(locator=locator)
+    a, b = m.row("Germany"), m.row("Chile")
+    ca, cb = locator.centroid("Germany"), locator.centroid("Chile")
+    scalar = _timeit(lambda: distance.vincenty_km_scalar(*ca, *cb), number=10000)
+    lookup = _timeit(lambda: m.distance(a, b, "edge"), number=10000)
+    print(f"country distance: scalar vincenty {scalar * 1e6:.2f} us -> matrix lookup {lookup * 1e6:.2f} us")
+
+
+# ---------- startup ----------
+STARTUP_SNIPPETS = {
+    "shapefile": "import geo; geo._load_shapefile()",
+    "artifact": "import geo; geo.load_locator()",
+}
+
+
+def _run_python(code):
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    return time.perf_counter() - t0
+
+
+def bench_startup(args):
+    # Cold-process import + geometry load, best of 3 fresh interpreters
+    base = min(_run_python("pass") for _ in range(3))
+    for name, code in STARTUP_SNIPPETS.items():
+        t = min(_run_python(code) for _ in range(3)) - base
+        print(f"{name:10s} import + load: {t * 1000:7.1f} ms")
+
+
+# ---------- imports ----------
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "project.py")
+
+
+def _import_screens(path=APP_PATH):
+    # Read off the app itself, so the profile follows its imports: the setup
+    # screen runs the module-level imports, the game screen adds the ones
+    # inside the `if "game" in st.session_state:` branch
+    import ast
+
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+
+    def imports(nodes):
+        return [ast.unparse(n) for n in nodes if isinstance(n, (ast.Import, ast.ImportFrom))]
+
+    setup = imports(tree.body)
+    game = [stmt for node in tree.body
+            if isinstance(node, ast.If) and "'game' in st.session_state" in ast.unparse(node.test)
+            for stmt in imports(ast.walk(node))]
+    return {"setup screen": "; ".join(setup), "game screen": "; ".join(setup + game)}
+
+
+def _import_profile(code):
+    # Parse `python -X importtime` output into (self_us, cumulative_us, module)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                          check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, module = line[len("import time:"):].split("|")
+        rows.append((int(self_us), int(cum_us), module.rstrip()))
+    return rows
+
+
+def bench_imports(args):
+    for screen, code in _import_screens().items():
+        rows = _import_profile(code)
+        total = sum(r[0] for r in rows)
+        print(f"{screen}: {len(rows)} modules, {total / 1000:.1f} ms")
+        # top-level packages by cumulative time
+        top = sorted((r for r in rows if not r[2].startswith("  ")), key=lambda r: r[1], reverse=True)
+        for _, cum, module in top[:8]:
+            print(f"  {cum / 1000:8.1f} ms  {module.strip()}")
+
+
+# ---------- engine ----------
+def bench_engine(args):
+    import random
+    import engine
+    import geo
+
+    locator = geo.load_locator()
+    countries = [{"name": {"common": n}, "cca3": c} for n, c in zip(locator.names, locator.codes)]
+    engine.simulate_rounds(100, countries, locator)  # warm up
+    t0 = time.perf_counter()
+    points = engine.simulate_rounds(args.n, countries, locator, random.Random(0))
+    dt = time.perf_counter() - t0
+    print(f"{args.n} simulated rounds in {dt:.2f} s: {args.n / dt * 60:,.0f} rounds/min, "
+          f"avg {sum(points) / len(points):.2f} points/round")
+
+
+# ---------- scoring pipeline ----------
+def _click_stream(locator, n, seed=0):
+    # Synthetic clicks: half uniform over the globe, half within ~5 deg of the target
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(locator.names), n)
+    lats, lons = _random_points(n, seed)
+    near = rng.random(n) < 0.5
+    lats[near] = np.clip(locator.centroids[rows[near], 0] + rng.normal(0, 5, near.sum()), -90, 90)
+    lons[near] = (locator.centroids[rows[near], 1] + rng.normal(0, 5, near.sum()) + 180) % 360 - 180
+    return rows, lats, lons
+
+
+def _read_stream(locator, path):
+    # Recorded clicks: CSV with lat, lon, country columns
+    rows, lats, lons = [], [], []
+    with open(path, newline="") as f:
+        for rec in csv.DictReader(f):
+            i = locator.row(rec["country"])
+            if i is not None:
+                rows.append(i)
+                lats.append(float(rec["lat"]))
+                lons.append(float(rec["lon"]))
+    return np.array(rows), np.array(lats), np.array(lons)
+
+
+def _block_latency(fn, calls, block):
+    # One pass over `calls`, timed in blocks of `block` calls so the clock
+    # overhead doesn't swamp sub-microsecond paths: (p50, p99) ns per call
+    clock = time.perf_counter_ns
+    samples = []
+    for k in range(0, len(calls) - block + 1, block):
+        chunk = calls[k:k + block]
+        t0 = clock()
+        for a in chunk:
+            fn(*a)
+        samples.append((clock() - t0) / block)
+    return np.percentile(samples, [50, 99])
+
+
+def _latency(fn, calls, block=50, repeat=5, reference=None):
+    # Latency of fn(*args) over `calls`: median of `repeat` passes (a best
+    # pass only tells how quiet the machine got), throughput from the median
+    # block. With reference=(fn, calls), a pass of that alternates with each
+    # pass, and "relative" is the median ratio of the two throughputs:
+    # both see the same machine load
+    for a in calls[:1000]:
+        fn(*a)  # warm up
+    passes, ratios = [], []
+    for _ in range(repeat):
+        passes.append(_block_latency(fn, calls, block))
+        if reference is not None:
+            ratios.append(_block_latency(*reference, block)[0] / passes[-1][0])
+    p50, p99 = np.median(passes, axis=0)
+    r = {"ops_per_s": 1e9 / p50, "p50_us": p50 / 1000, "p99_us": p99 / 1000}
+    if ratios:
+        r["relative"] = float(np.median(ratios))
+    return r
+
+
+def _throughput(fn, n, repeat=9, reference=None):
+    # Items/s of one fn() call over n items, median of `repeat` passes;
+    # `reference` as for _latency
+    times, ratios = [], []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+        if reference is not None:
+            ratios.append(n / times[-1] / (1e9 / _block_latency(*reference, 50)[0]))
+    r = {"ops_per_s": n / float(np.median(times))}
+    if ratios:
+        r["relative"] = float(np.median(ratios))
+    return r
+
+
+def _reference_kernel(lat1, lon1, lat2, lon2):
+    # Fixed plain-Python haversine, independent of the game's code: --check
+    # compares each path's throughput relative to it, so the baseline carries
+    # over between machines and load levels
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    h = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 12742.0176 * math.asin(math.sqrt(h))
+
+
+def bench_pipeline(args):
+    import random
+    import distance
+    import engine
+    import geo
+
+    baseline = None
+    if args.check:
+        # Same workload as the baseline run, whatever --n/--stream say
+        try:
+            with open(BASELINE_PATH) as f:
+                baseline = json.load(f)
+        except FileNotFoundError:
+            sys.exit(f"no baseline at {BASELINE_PATH}: run with --save-baseline first")
+        if "relative" not in baseline:
+            sys.exit(f"{BASELINE_PATH} holds absolute ops/s: re-run with --save-baseline")
+        args.n, args.stream = baseline["workload"]["n"], baseline["workload"]["stream"]
+        print(f"workload from baseline: n={args.n:,} stream={args.stream}")
+
+    locator = geo.load_locator()
+    if args.stream:
+        rows, lats, lons = _read_stream(locator, args.stream)
+    else:
+        rows, lats, lons = _click_stream(locator, args.n)
+    names = [locator.names[i] for i in rows]
+    m = min(len(rows), 20_000)  # per-call paths are sampled
+    calls = list(zip(names[:m], lats[:m].tolist(), lons[:m].tolist()))
+    results = {}
+
+    cents = [(a, b) + tuple(locator.centroids[i]) for i, a, b in zip(rows[:m], lats[:m], lons[:m])]
+    ref = (_reference_kernel, cents)
+    _latency(*ref, repeat=1)  # warm up
+    results["centroid"] = _latency(lambda n, a, b: locator.centroid(n), calls, reference=ref)
+    results["contains"] = _latency(locator.contains, calls, reference=ref)
+    results["geodesic"] = _latency(distance.vincenty_km_scalar, cents, reference=ref)
+    results["edge_km"] = _latency(locator.edge_km, calls, reference=ref)
+
+    countries = [{"name": {"common": n}} for n in locator.names]
+
+    def clicker(scoring):
+        game = engine.Game(["bench"], float("inf"), countries, random.Random(0), scoring=scoring)
+
+        def click(name, lat, lon):
+            if game.round_over:
+                game.new_round()
+            game.process_click(lat, lon, locator)
+        return click
+    click, click_edge = clicker("centroid"), clicker("edge")
+    results["process_click"] = _latency(click, calls, reference=ref)
+
+    game = engine.Game(["bench"], float("inf"), countries, random.Random(0))
+
+    def guess(name, lat, lon):
+        if game.round_over:
+            game.new_round()
+        game.process_guess(name)
+    results["process_guess"] = _latency(guess, calls, reference=ref)
+    results["process_click_edge"] = _latency(click_edge, calls, reference=ref)
+
+    # Batch path: whole stream through hit test + distance at once
+    tracemalloc.start()
+    locator.evaluate(rows, lats, lons)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    results["batch_evaluate"] = _throughput(lambda: locator.evaluate(rows, lats, lons), len(rows), reference=ref)
+    results["batch_evaluate"]["peak_mb"] = peak / 2**20
+    results["batch_evaluate_edge"] = _throughput(lambda: locator.evaluate(rows, lats, lons, mode="edge"), len(rows),
+                                                 reference=ref)
+
+    # x = throughput as a multiple of the plain-Python reference kernel's
+    for name, r in results.items():
+        extra = "  ".join(f"{k}={v:,.2f}" for k, v in r.items() if k not in ("ops_per_s", "relative"))
+        print(f"{name:19s} {r['ops_per_s']:>14,.0f} ops/s  x{r['relative']:<8.3f} {extra}")
+
+    if args.save_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump({"workload": {"n": args.n, "stream": args.stream},
+                       "relative": {k: round(v["relative"], 4) for k, v in results.items()}}, f, indent=2)
+        print(f"baseline written to {BASELINE_PATH}")
+    elif baseline is not None:
+        # ops/s as a multiple of the reference kernel's, against the same
+        # multiple in the baseline
+        expected = baseline["relative"]
+        failed = [k for k, v in expected.items()
+                  if k in results and results[k]["relative"] < v * (1 - args.tolerance)]
+        for k in failed:
+            print(f"REGRESSION {k}: x{results[k]['relative']:.3f} of reference < baseline x{expected[k]:.3f}")
+        # Edge scoring must not cost more per click than the centroid path:
+        # edge timed against centroid as the reference, cost = 1 / relative
+        pairs = [c + t[2:] for c, t in zip(calls, cents)]
+        budgets = {
+            "edge_km vs contains + geodesic": 1 / _latency(
+                lambda n, a, b, c, d: locator.edge_km(n, a, b), pairs,
+                reference=(lambda n, a, b, c, d: (locator.contains(n, a, b), distance.vincenty_km_scalar(a, b, c, d)),
+                           pairs))["relative"],
+            "process_click edge vs centroid": 1 / _latency(click_edge, calls, reference=(click, calls))["relative"],
+        }
+        over = [k for k, cost in budgets.items() if cost > 1.0]
+        for k, cost in budgets.items():
+            print(f"{'OVER BUDGET' if k in over else 'budget'} {k}: {cost:.2f}x the cost")
+        if failed or over:
+            sys.exit(1)
+        print("no regressions against baseline, edge scoring within budget")
+
+
+# ---------- event log ----------
+def bench_events(args):
+    import random
+    import shutil
+    import tempfile
+    import analytics
+    import engine
+    import geo
+    from events import EventLog, event_files, read_events
+
+    locator = geo.load_locator()
+    countries = [{"name": {"common": n}, "cca3": c} for n, c in zip(locator.names, locator.codes)]
+    directory = tempfile.mkdtemp(prefix="cg-events-")
+    try:
+        # Cost on the game thread: simulated rounds with and without a log
+        log = EventLog(directory)
+        sink = log.sink(sid="bench", difficulty="All Countries")
+        t0 = time.perf_counter()
+        engine.simulate_rounds(args.n, countries, locator, random.Random(0))
+        bare = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        engine.simulate_rounds(args.n, countries, locator, random.Random(0), events=sink)
+        logged = time.perf_counter() - t0
+        log.flush()
+        size = sum(os.path.getsize(p) for p in event_files(directory))
+        print(f"{args.n} rounds: {bare:.2f} s bare, {logged:.2f} s logged "
+              f"({(logged - bare) / log.written * 1e6:.1f} us/event on the game thread), "
+              f"{log.written:,} events, {size / log.written:.0f} bytes/event, {log.dropped} dropped")
+
+        # Streaming analytics over the log
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        stats, _ = analytics.aggregate(read_events(event_files(directory)))
+        dt = time.perf_counter() - t0
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"analytics: {log.written / dt:,.0f} events/s, {len(stats)} countries, peak {peak / 2**20:.2f} MiB")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+# ---------- evaluation service ----------
+def bench_evalserver(args):
+    from concurrent.futures import ThreadPoolExecutor
+    import geo
+    from eval_server import EvalService
+
+    locator = geo.load_locator()
+    rows, lats, lons = _click_stream(locator, args.n)
+    reqs = [(locator.names[i], a, b) for i, a, b in zip(rows, lats.tolist(), lons.tolist())]
+    sessions = 32  # concurrent "Streamlit sessions", one guess at a time each
+
+    for workers in (0, os.cpu_count()):
+        service = EvalService(workers=workers, locator=locator)
+        service.evaluate(*reqs[0])  # warm up the pool
+
+        def session(k):
+            for req in reqs[k::sessions]:
+                service.evaluate(*req)
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(sessions) as ex:
+            list(ex.map(session, range(sessions)))
+        dt = time.perf_counter() - t0
+        service.close()
+        print(f"workers={workers:<3d} {sessions} sessions: {len(reqs) / dt:,.0f} guesses/s")
+
+
+# ---------- memory ----------
+def _footprint(make, n):
+    # Bytes retained per object made by make(), averaged over n of them
+    import gc
+
+    make()
+    gc.collect()
+    tracemalloc.start()
+    keep = [make() for _ in range(n)]
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del keep
+    return size / n
+
+
+def bench_memory(args):
+    import copy
+    import random
+    import types
+    import catalog
+    import engine
+
+    countries = catalog.countries()
+    ids = list(range(len(countries)))  # "All Countries"
+    if not ids:
+        print("no catalog snapshot (python catalog.py)")
+        return
+
+    def play(game):
+        # three rounds with three clicks each, as a session mid-game holds it
+        for _ in range(3):
+            for k in range(3):
+                game.score_click(10.0 + k, 20.0, False, 5000.0)
+            game.round_over = True
+            game.next_player()
+            game.new_round()
+        return game
+
+    def legacy():
+        # Layout before ids/slots: the session's own country dicts (as
+        # fetched per game), its own code mapping and Random, list deck,
+        # tuple guesses, plain attribute dicts
+        pool = copy.deepcopy(countries)
+        s = types.SimpleNamespace(countries=pool, used_countries=pool[:3], country=pool[3])
+        s.code_to_name = {c["cca3"]: c["name"]["common"] for c in pool if c.get("cca3")}
+        s.rng = random.Random()
+        s.order = list(range(len(pool)))
+        s.guesses = [(10.0 + k, 20.0) for k in range(3)]
+        s.players = [types.SimpleNamespace(name=n, score=0, rounds_played=0) for n in ("Alice", "Bob")]
+        return s
+
+    def compact():
+        return play(engine.Game(["Alice", "Bob"], 20, countries, ids=ids, code_to_name=catalog.code_to_name()))
+
+    n = min(args.n, 2000)
+    before, after = _footprint(legacy, n), _footprint(compact, n)
+    print(f"per session ({len(ids)} countries): dicts {before / 1024:.1f} KiB -> ids {after / 1024:.2f} KiB "
+          f"({before / after:.0f}x); 10k sessions: {before * 1e4 / 2**20:.0f} MiB -> {after * 1e4 / 2**20:.0f} MiB")
+
+
+# ---------- names ----------
+def bench_names(args):
+    import random
+    import catalog
+    from name_index import NameIndex
+
+    countries = catalog.countries()
+    if not countries:
+        print("no catalog snapshot (python catalog.py)")
+        return
+    t0 = time.perf_counter()
+    index = NameIndex(countries)
+    print(f"index build: {(time.perf_counter() - t0) * 1000:.1f} ms, "
+          f"{len(index.keys)} spellings, {len(index.grams)} trigram lists")
+
+    # Typed guesses: exact spellings, one-typo spellings, misses, prefixes
+    rng = random.Random(0)
+    exact = [rng.choice(index.keys) for _ in range(1000)]
+
+    def typo(key):
+        k = rng.randrange(len(key))
+        return key[:k] + rng.choice("aeiouxyz") + key[k + 1:]
+    typos = [typo(key) for key in exact]
+    misses = ["".join(rng.choice("bcdfghjklmnpqrstvwxz") for _ in range(rng.randint(4, 12))) for _ in range(1000)]
+    prefixes = [key[:rng.randint(1, 4)] for key in exact]
+
+    for name, fn, queries in (("match exact", index.match, exact), ("match typo", index.match, typos),
+                              ("match miss", index.match, misses), ("complete", index.complete, prefixes)):
+        dt = _timeit(lambda: [fn(q) for q in queries]) / len(queries)
+        print(f"{name:12s} {dt * 1e6:8.1f} us/query")
+
+
+BENCHMARKS = {
+    "distance": bench_distance,
+    "engine": bench_engine,
+    "evalserver": bench_evalserver,
+    "events": bench_events,
+    "imports": bench_imports,
+    "memory": bench_memory,
+    "names": bench_names,
+    "pipeline": bench_pipeline,
+    "startup": bench_startup,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Country Guesser benchmarks")
+    parser.add_argument("name", choices=sorted(BENCHMARKS) + ["all"])
+    parser.add_argument("--n", type=int, default=10_000, help="problem size")
+    parser.add_argument("--stream", help="recorded click stream CSV (lat, lon, country) for pipeline")
+    parser.add_argument("--save-baseline", action="store_true", help="store pipeline results as the baseline")
+    parser.add_argument("--check", action="store_true", help="fail if pipeline throughput regresses")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed slowdown for --check")
+    args = parser.parse_args()
+    for name in (sorted(BENCHMARKS) if args.name == "all" else [args.name]):
+        print(f"== {name} ==")
+        BENCHMARKS[name](args)
+
+
+if __name__ == "__main__":
+    main()
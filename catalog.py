@@ -0,0 +1,144 @@
+# ==================== Country Catalog ====================
+# Offline snapshot of the restcountries fields the game uses.
+# Build it with:  python catalog.py
+# The app loads the snapshot once per process; refresh.py keeps it fresh
+# in the background, so starting a game never waits on the network.
+
+import json
+import os
+import sys
+import threading
+import time
+
+CATALOG_URL = "https://restcountries.com/v3.1/all"
+# restcountries allows at most 10 fields per request
+CATALOG_FIELDS = ["name", "cca3", "population", "area", "flags", "capital", "borders", "altSpellings", "translations"]
+CATALOG_VERSION = 2  # 2: altSpellings + translations for name matching
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "countries.json")
+
+_lock = threading.Lock()
+_catalog = None
+_views = {}  # derived lookups, rebuilt when the snapshot is swapped
+
+
+def _slim(country):
+    # Keep only the fields we snapshot (name without native names)
+    c = {k: country[k] for k in CATALOG_FIELDS if k in country}
+    if "name" in c:
+        c["name"] = {k: v for k, v in c["name"].items() if k in ("common", "official")}
+    if "translations" in c:
+        c["translations"] = {lang: {k: v for k, v in t.items() if k in ("common", "official")}
+                             for lang, t in c["translations"].items()}
+    return c
+
+
+def make_catalog(payload, etag=None, last_modified=None):
+    countries = [_slim(c) for c in payload if "name" in c and "common" in c["name"]]
+    countries.sort(key=lambda c: c["name"]["common"])
+    # HTTP validators are kept for conditional refreshes (see refresh.py)
+    return {"version": CATALOG_VERSION, "built": int(time.time()), "etag": etag,
+            "last_modified": last_modified, "countries": countries}
+
+
+def fetch_catalog(timeout=10):
+    import requests  # only needed when (re)building the snapshot
+
+    r = requests.get(CATALOG_URL, params={"fields": ",".join(CATALOG_FIELDS)}, timeout=timeout)
+    r.raise_for_status()
+    return make_catalog(r.json(), r.headers.get("ETag"), r.headers.get("Last-Modified"))
+
+
+def write_catalog(catalog, path=CATALOG_PATH):
+    # Write to a temp file and swap it in so readers never see a partial file
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(catalog, f, ensure_ascii=False, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read_catalog(path=CATALOG_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        catalog = json.load(f)
+    if not isinstance(catalog.get("version"), int) or catalog["version"] > CATALOG_VERSION:
+        return None
+    # Older snapshots stay playable until refresh.py replaces them
+    return catalog
+
+
+def install_catalog(catalog, path=CATALOG_PATH):
+    # Persist, then swap the in-memory snapshot in one step
+    global _catalog
+    write_catalog(catalog, path)
+    with _lock:
+        _catalog = catalog
+    return catalog
+
+
+def refresh_catalog(path=CATALOG_PATH):
+    return install_catalog(fetch_catalog(), path)
+
+
+def load_catalog():
+    global _catalog
+    with _lock:
+        if _catalog is not None:
+            return _catalog
+        _catalog = read_catalog()
+    if _catalog is None:
+        # No usable snapshot yet: bootstrap once from the API
+        try:
+            refresh_catalog()
+        except (OSError, ValueError):  # requests errors are OSErrors
+            with _lock:
+                _catalog = {"version": CATALOG_VERSION, "built": 0, "countries": []}
+    return _catalog
+
+
+def _view(key, build):
+    # One shared copy per snapshot for all sessions; treat as read-only
+    catalog = load_catalog()
+    with _lock:
+        hit = _views.get(key)
+        if hit is not None and hit[0] is catalog:
+            return hit[1]
+    value = build(catalog["countries"])
+    with _lock:
+        _views[key] = (catalog, value)
+    return value
+
+
+def countries():
+    return load_catalog()["countries"]
+
+
+def countries_by_name():
+    return _view("by_name", lambda cs: {c["name"]["common"]: c for c in cs})
+
+
+def ids_by_name():
+    # common name -> index into countries()
+    return _view("ids", lambda cs: {c["name"]["common"]: i for i, c in enumerate(cs)})
+
+
+def name_index():
+    # typed-guess matching and autocomplete over every known spelling
+    from name_index import NameIndex
+
+    return _view("names", NameIndex)
+
+
+def code_to_name():
+    # cca3 -> common name over the whole catalog (border hints name
+    # neighbours from any difficulty)
+    return _view("codes", lambda cs: {c["cca3"]: c["name"]["common"] for c in cs if c.get("cca3")})
+
+
+if __name__ == "__main__":
+    out = sys.argv[1] if len(sys.argv) > 1 else CATALOG_PATH
+    catalog = fetch_catalog()
+    write_catalog(catalog, out)
+    print(f"Wrote {len(catalog['countries'])} countries to {out}")
@@ -0,0 +1,151 @@
+# ==================== Daily Challenge ====================
+# One fixed round sequence per UTC day and difficulty, the same for every
+# player. It is generated ahead of time together with everything its rounds
+# show (hints, flag image, solution outline), and all
+# difficulties of a day are bundled into one artifact, data/daily/<day>.json,
+# that every session and replica reads instead of doing its own lookups.
+#
+#   python daily.py build [days]   # today and the following days - 1
+#
+# The sequence is the engine's seeded RoundDeck over the day's pool, so
+# daily_game() replays it with a plain Game(ids=pool, seed=seed).
+
+import base64
+import datetime
+import json
+import os
+import sys
+
+import catalog
+from difficulty import difficulty_lists
+from engine import Game, MAX_HINTS, get_hint
+
+DAILY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "daily")
+DAILY_VERSION = 2
+DAILY_ROUNDS = 10
+
+
+def today():
+    return datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+
+
+def daily_seed(day, difficulty):
+    return f"daily:{day}:{difficulty}"
+
+
+def daily_path(day, directory=DAILY_DIR):
+    return os.path.join(directory, f"{day}.json")
+
+
+# ==================== Build ====================
+def _pool(difficulty):
+    # Catalog ids of the difficulty's countries, as in project.fetch_country_ids
+    name_to_id = catalog.ids_by_name()
+    return [name_to_id[name] for name in difficulty_lists.get(difficulty, []) if name in name_to_id]
+
+
+def _flag_png(country, flags, download):
+    data = flags.get(country)
+    if data is None and download:
+        try:
+            data = flags.fetch(country)
+        except (OSError, ValueError):
+            data = None
+    return None if data is None else base64.b64encode(data).decode()
+
+
+def _round(country, code_to_name, locator, flags, download):
+    # Clicks are scored from the click point, not from the clicked country,
+    # so there are no country-to-country distances to bundle
+    name = country["name"]["common"]
+    outline = locator.outline_geojson(name, zoom=2)  # map_view.OUTLINE_ZOOM, finer ones are made on zoom
+    return {
+        "code": country.get("cca3"),
+        "name": name,
+        "hints": [get_hint(country, i, code_to_name) for i in range(1, MAX_HINTS + 1)],
+        "flag": _flag_png(country, flags, download),  # base64 PNG for hint 3, None: use the URL hint
+        "outline": json.loads(outline) if outline else None,
+    }
+
+
+def build_daily(day, locator=None, flags=None, download=True, out=DAILY_DIR):
+    # Generates (and writes) the artifact for one day; deterministic for a
+    # given catalog snapshot, so concurrent builders write the same file
+    import geo
+    from flags import FlagCache
+
+    locator = locator or geo.load_locator()
+    flags = flags or FlagCache()
+    countries, code_to_name = catalog.countries(), catalog.code_to_name()
+
+    challenges = {}
+    for difficulty in difficulty_lists:
+        ids = _pool(difficulty)
+        if not ids:
+            continue
+        seed = daily_seed(day, difficulty)
+        game = Game(["daily"], float("inf"), countries, seed=seed, code_to_name=code_to_name, ids=ids)
+        rounds = []
+        for _ in range(min(DAILY_ROUNDS, len(ids))):
+            rounds.append(_round(game.country, code_to_name, locator, flags, download))
+            game.new_round()
+        challenges[difficulty] = {"seed": seed, "pool": [countries[i].get("cca3") for i in ids], "rounds": rounds}
+
+    artifact = {"version": DAILY_VERSION, "day": day, "challenges": challenges}
+    os.makedirs(out, exist_ok=True)
+    path = daily_path(day, out)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(artifact, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+    return artifact
+
+
+def load_daily(day, directory=DAILY_DIR, **build_kwargs):
+    # The day's artifact, built first if it wasn't generated ahead of time
+    try:
+        with open(daily_path(day, directory), encoding="utf-8") as f:
+            artifact = json.load(f)
+        if artifact.get("version") == DAILY_VERSION and artifact.get("day") == day:
+            return artifact
+    except (OSError, ValueError):
+        pass
+    return build_daily(day, out=directory, **build_kwargs)
+
+
+# ==================== Play ====================
+def daily_game(artifact, difficulty, player, countries=None, code_to_name=None, events=None):
+    # Game replaying the day's sequence for one player, None if the
+    # difficulty is missing or the catalog no longer matches the artifact
+    challenge = artifact["challenges"].get(difficulty)
+    if challenge is None:
+        return None
+    countries = catalog.countries() if countries is None else countries
+    by_code = {c.get("cca3"): i for i, c in enumerate(countries)}
+    if not all(code in by_code for code in challenge["pool"]):
+        return None
+    game = Game([player], float("inf"), countries, seed=challenge["seed"],
+                code_to_name=code_to_name or catalog.code_to_name(),
+                ids=[by_code[code] for code in challenge["pool"]], max_rounds=len(challenge["rounds"]),
+                events=events)
+    return game if game.country.get("cca3") == challenge["rounds"][0]["code"] else None
+
+
+def current_round(artifact, difficulty, game):
+    # Precomputed data of the game's current round, None if it doesn't match
+    rounds = artifact["challenges"].get(difficulty, {}).get("rounds", [])
+    k = game.round_number - 1
+    if 0 <= k < len(rounds) and rounds[k]["code"] == game.country.get("cca3"):
+        return rounds[k]
+    return None
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["build"]:
+        start = datetime.date.fromisoformat(today())
+        for k in range(int(sys.argv[2]) if len(sys.argv) > 2 else 1):
+            day = (start + datetime.timedelta(days=k)).isoformat()
+            build_daily(day)
+            print(f"Wrote {daily_path(day)}")
+    else:
+        print("usage: python daily.py build [days]")
@@ -0,0 +1,48 @@
+# ==================== Difficulty Tiers ====================
+# Country common names per difficulty, shared by project.py (game setup)
+# and daily.py (daily challenge pools). Defined manually; tiers re-sorted
+# from played games (python analytics.py retier --write) take their place.
+
+import json
+import os
+
+TIERS = ("Easy", "Medium", "Hard")
+TIERS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "difficulty_tiers.json")
+
+difficulty_lists = {
+    "Easy": [
+        "United States", "United Kingdom", "Germany", "France", "Italy", "Spain", "Canada", "Australia",
+        "China", "Japan", "Brazil", "Russia", "Netherlands", "Austria", "Switzerland", "Portugal", "Belgium",
+        "Sweden", "Norway", "Denmark", "Ireland", "Poland", "Greece", "Turkey", "Egypt", "South Africa",
+        "India", "Mexico", "Argentina", "South Korea"
+    ],
+    "Medium": [
+        "Thailand", "Morocco", "Ukraine", "Israel", "Tunisia", "United Arab Emirates", "Czech Republic",
+        "Romania", "Serbia", "Croatia", "Hungary", "Finland", "Slovakia", "Bulgaria", "Algeria", "Vietnam",
+        "Indonesia", "Malaysia", "Pakistan", "Nigeria", "Colombia", "Chile", "Peru", "Iran", "Kazakhstan",
+        "Philippines", "Cuba", "Jordan", "Lebanon", "Venezuela"
+    ],
+    "Hard": [
+        "Uzbekistan", "Myanmar", "Bangladesh", "Nepal", "Laos", "Cambodia", "Mongolia", "Sri Lanka",
+        "Ethiopia", "Kenya", "Ghana", "Zambia", "Angola", "Mozambique", "Sudan", "Yemen", "Syria", "Afghanistan",
+        "Mali", "Burkina Faso", "Chad", "Niger", "Rwanda", "Uganda", "Tanzania", "Democratic Republic of the Congo",
+        "Bolivia", "Guatemala", "Honduras", "North Korea", "Albania", "Armenia", "Azerbaijan", "Bahrain",
+        "Belarus", "Benin", "Bhutan", "Bosnia and Herzegovina", "Botswana", "Burundi", "Central African Republic",
+        "Comoros", "Congo", "Costa Rica", "Côte d'Ivoire", "Cyprus", "Djibouti", "Dominican Republic", "Ecuador",
+        "El Salvador", "Eritrea", "Estonia", "Eswatini", "Fiji", "Gabon", "Gambia", "Georgia", "Guinea",
+        "Guinea-Bissau", "Guyana", "Haiti", "Iceland", "Iraq", "Jamaica", "Kyrgyzstan", "Latvia", "Lesotho",
+        "Liberia", "Libya", "Lithuania", "Madagascar", "Malawi", "Maldives", "Mauritania", "Mauritius", "Moldova",
+        "Namibia", "Nicaragua", "North Macedonia", "Oman", "Panama", "Papua New Guinea", "Paraguay", "Qatar",
+        "Sierra Leone", "Singapore", "Slovenia", "Somalia", "Suriname", "Timor-Leste", "Togo",
+        "Trinidad and Tobago", "Turkmenistan", "Uruguay", "Zimbabwe", "Cabo Verde", "Luxembourg", "Brunei",
+        "Montenegro", "Equatorial Guinea", "Sao Tome and Principe", "Seychelles", "Solomon Islands", "Vanuatu",
+        "Saint Lucia", "Saint Vincent and the Grenadines", "Samoa", "Kiribati", "Barbados", "Belize", "Bahamas",
+        "Saint Kitts and Nevis", "Micronesia", "Palau", "Tonga", "Marshall Islands", "Antigua and Barbuda", "Dominica"
+    ]
+}
+try:
+    with open(TIERS_PATH, encoding="utf-8") as f:
+        difficulty_lists.update({tier: names for tier, names in json.load(f).items() if tier in TIERS})
+except (OSError, ValueError):
+    pass
+difficulty_lists["All Countries"] = difficulty_lists["Easy"] + difficulty_lists["Medium"] + difficulty_lists["Hard"]
@@ -0,0 +1,172 @@
+# ==================== Distance Engine ====================
+# Vectorized great-circle / ellipsoidal distances in km.
+# All functions broadcast like NumPy: pass scalars or arrays of guesses
+# against one target, or shape (n, 1) vs (m,) for n x m tables.
+
+import math
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088  # mean radius, used by haversine
+
+# WGS84 ellipsoid (same as geopy.distance.geodesic)
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_B = (1 - WGS84_F) * WGS84_A
+# Central angle (rad) beyond which lambert_km hands over to Vincenty:
+# its correction terms blow up towards antipodal points
+LAMBERT_MAX_SIGMA = 3.0
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    h = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+
+def _karney_km(lat1, lon1, lat2, lon2):
+    # Exact fallback for the few (near-antipodal) pairs where Vincenty fails
+    from geographiclib.geodesic import Geodesic
+    inv = Geodesic.WGS84.Inverse
+    return np.array([inv(a, b, c, d, Geodesic.DISTANCE)["s12"] / 1000.0
+                     for a, b, c, d in zip(lat1, lon1, lat2, lon2)])
+
+
+def vincenty_km(lat1, lon1, lat2, lon2, tol=1e-12, max_iter=30):
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (lat1, lon1, lat2, lon2)))
+    shape = lat1.shape
+    lat1, lon1, lat2, lon2 = (v.ravel() for v in (lat1, lon1, lat2, lon2))
+    f, b = WGS84_F, WGS84_B
+
+    L = np.radians(lon2 - lon1)
+    U1 = np.arctan((1 - f) * np.tan(np.radians(lat1)))
+    U2 = np.arctan((1 - f) * np.tan(np.radians(lat2)))
+    sinU1, cosU1 = np.sin(U1), np.cos(U1)
+    sinU2, cosU2 = np.sin(U2), np.cos(U2)
+
+    n = L.size
+    lam = L.copy()
+    sin_sigma, cos_sigma, sigma = np.empty(n), np.empty(n), np.empty(n)
+    cos2_alpha, cos_2sm = np.empty(n), np.empty(n)
+    active = np.arange(n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # iterate only the pairs that have not converged yet
+        for _ in range(max_iter):
+            if not active.size:
+                break
+            sU1, cU1, sU2, cU2 = sinU1[active], cosU1[active], sinU2[active], cosU2[active]
+            lm = lam[active]
+            sin_lam, cos_lam = np.sin(lm), np.cos(lm)
+            ss = np.hypot(cU2 * sin_lam, cU1 * sU2 - sU1 * cU2 * cos_lam)
+            cs = sU1 * sU2 + cU1 * cU2 * cos_lam
+            sg = np.arctan2(ss, cs)
+            sin_alpha = np.where(ss == 0, 0.0, cU1 * cU2 * sin_lam / ss)
+            c2a = 1 - sin_alpha ** 2
+            c2sm = np.where(c2a == 0, 0.0, cs - 2 * sU1 * sU2 / c2a)
+            C = f / 16 * c2a * (4 + f * (4 - 3 * c2a))
+            lam_new = L[active] + (1 - C) * f * sin_alpha * (
+                sg + C * ss * (c2sm + C * cs * (-1 + 2 * c2sm ** 2)))
+            sin_sigma[active], cos_sigma[active], sigma[active] = ss, cs, sg
+            cos2_alpha[active], cos_2sm[active] = c2a, c2sm
+            lam[active] = lam_new
+            active = active[np.abs(lam_new - lm) >= tol]
+
+        u2 = cos2_alpha * (WGS84_A ** 2 - b ** 2) / b ** 2
+        A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+        B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+        d_sigma = B * sin_sigma * (cos_2sm + B / 4 * (
+            cos_sigma * (-1 + 2 * cos_2sm ** 2)
+            - B / 6 * cos_2sm * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sm ** 2)))
+        s = b * A * (sigma - d_sigma) / 1000.0
+
+    bad = np.zeros(n, dtype=bool)
+    bad[active] = True
+    bad |= ~np.isfinite(s)
+    if bad.any():
+        s[bad] = _karney_km(lat1[bad], lon1[bad], lat2[bad], lon2[bad])
+    return s.reshape(shape)
+
+
+def vincenty_km_scalar(lat1, lon1, lat2, lon2, tol=1e-12, max_iter=30):
+    # Pure-Python version for single pairs: no NumPy call overhead per click
+    f, b = WGS84_F, WGS84_B
+    L = math.radians(lon2 - lon1)
+    U1 = math.atan((1 - f) * math.tan(math.radians(lat1)))
+    U2 = math.atan((1 - f) * math.tan(math.radians(lat2)))
+    sinU1, cosU1, sinU2, cosU2 = math.sin(U1), math.cos(U1), math.sin(U2), math.cos(U2)
+    lam = L
+    for _ in range(max_iter):
+        sin_lam, cos_lam = math.sin(lam), math.cos(lam)
+        sin_sigma = math.hypot(cosU2 * sin_lam, cosU1 * sinU2 - sinU1 * cosU2 * cos_lam)
+        if sin_sigma == 0:
+            return 0.0  # coincident points
+        cos_sigma = sinU1 * sinU2 + cosU1 * cosU2 * cos_lam
+        sigma = math.atan2(sin_sigma, cos_sigma)
+        sin_alpha = cosU1 * cosU2 * sin_lam / sin_sigma
+        cos2_alpha = 1 - sin_alpha ** 2
+        cos_2sm = cos_sigma - 2 * sinU1 * sinU2 / cos2_alpha if cos2_alpha else 0.0
+        C = f / 16 * cos2_alpha * (4 + f * (4 - 3 * cos2_alpha))
+        lam_prev = lam
+        lam = L + (1 - C) * f * sin_alpha * (sigma + C * sin_sigma * (cos_2sm + C * cos_sigma * (-1 + 2 * cos_2sm ** 2)))
+        if abs(lam - lam_prev) < tol:
+            break
+    else:
+        return float(_karney_km([lat1], [lon1], [lat2], [lon2])[0])
+    u2 = cos2_alpha * (WGS84_A ** 2 - b ** 2) / b ** 2
+    A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+    B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+    d_sigma = B * sin_sigma * (cos_2sm + B / 4 * (
+        cos_sigma * (-1 + 2 * cos_2sm ** 2) - B / 6 * cos_2sm * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sm ** 2)))
+    return b * A * (sigma - d_sigma) / 1000.0
+
+
+def lambert_km(lat1, lon1, lat2, lon2):
+    # Lambert's formula: the central angle between reduced latitudes plus a
+    # first-order flattening term. Within 1 m of Vincenty up to a few hundred
+    # km and ~10 m at 3000 km, for a fraction of the cost (no iteration);
+    # near-antipodal pairs go to vincenty_km. Used for distance-to-border,
+    # whose nearest vertex is a few km approximate anyway.
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (lat1, lon1, lat2, lon2)))
+    f = WGS84_F
+    b1 = np.arctan((1 - f) * np.tan(np.radians(lat1)))
+    b2 = np.arctan((1 - f) * np.tan(np.radians(lat2)))
+    h = np.sin((b2 - b1) / 2) ** 2 + np.cos(b1) * np.cos(b2) * np.sin(np.radians(lon2 - lon1) / 2) ** 2
+    sigma = 2 * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+    P, Q = (b1 + b2) / 2, (b2 - b1) / 2
+    with np.errstate(invalid="ignore", divide="ignore"):
+        X = (sigma - np.sin(sigma)) * (np.sin(P) * np.cos(Q)) ** 2 / (1 - h)
+        Y = (sigma + np.sin(sigma)) * (np.cos(P) * np.sin(Q)) ** 2 / h
+        s = np.where(h == 0, 0.0, WGS84_A * (sigma - f / 2 * (X + Y)) / 1000.0)
+    far = sigma > LAMBERT_MAX_SIGMA
+    if far.any():
+        s = np.where(far, vincenty_km(lat1, lon1, lat2, lon2), s)
+    return s
+
+
+def lambert_km_scalar(lat1, lon1, lat2, lon2):
+    # Pure-Python lambert_km for single pairs (~2.5 us against ~12 us)
+    f = WGS84_F
+    b1 = math.atan((1 - f) * math.tan(math.radians(lat1)))
+    b2 = math.atan((1 - f) * math.tan(math.radians(lat2)))
+    P, Q = (b1 + b2) / 2, (b2 - b1) / 2
+    h = math.sin(Q) ** 2 + math.cos(b1) * math.cos(b2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    if h <= 0.0:
+        return 0.0  # coincident points
+    sigma = 2 * math.asin(math.sqrt(min(h, 1.0)))
+    if sigma > LAMBERT_MAX_SIGMA:
+        return vincenty_km_scalar(lat1, lon1, lat2, lon2)
+    sin_sigma = math.sin(sigma)
+    X = (sigma - sin_sigma) * (math.sin(P) * math.cos(Q)) ** 2 / (1 - h)
+    Y = (sigma + sin_sigma) * (math.cos(P) * math.sin(Q)) ** 2 / h
+    return WGS84_A * (sigma - f / 2 * (X + Y)) / 1000.0
+
+
+# Default ellipsoidal distance: drop-in for geopy.distance.geodesic(...).km
+geodesic_km = vincenty_km
+
+
+def pairwise_km(lats, lons, target_lats, target_lons, method=geodesic_km):
+    # n guesses x m targets table
+    lats = np.asarray(lats, dtype=float)[:, None]
+    lons = np.asarray(lons, dtype=float)[:, None]
+    return method(lats, lons, np.asarray(target_lats, dtype=float), np.asarray(target_lons, dtype=float))
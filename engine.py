@@ -0,0 +1,370 @@
+# ==================== Game Engine ====================
+# Pure-Python game rules, independent of Streamlit. project.py and
+# map_view.py drive it; bench.py uses it to simulate games headlessly.
+
+import random
+from array import array
+
+MAX_HINTS = 5
+MAX_GUESSES = 5
+CLOSE_HIT_KM = 250
+HELP_PENALTY = 1
+# What the close-hit distance is measured to: the target's centroid, or the
+# nearest point of its border (fairer for large or stretched countries)
+SCORING_MODES = ("centroid", "edge")
+
+
+# ==================== Hints ====================
+def format_population(n):
+    return f"{n:,}" if isinstance(n, int) else "Unknown"
+
+def get_hint(country, i, code_to_name=None):
+    if i == 1:
+        return f"Population: {format_population(country.get('population', 0))}"
+    if i == 2:
+        area = country.get("area")
+        return f"Area: {int(area):,} km²" if area else "Area: Unknown"
+    if i == 3:
+        flag = country.get("flags", {})
+        return flag.get("png") or flag.get("svg") or ""
+    if i == 4:
+        caps = country.get("capital") or []
+        return "Capital: " + ", ".join(caps) if caps else "Capital: Unknown"
+    if i == 5:
+        borders = country.get("borders") or []
+        mapping = code_to_name or {}
+        names = [mapping.get(c, c) for c in borders]
+        return "Borders: " + ", ".join(names) if names else "Borders: None"
+    return ""
+
+
+# ==================== Round Selection ====================
+class RoundDeck:
+    # Shuffled deck of country indices: every country comes up once before
+    # any repeats, each draw is O(1) (reshuffle amortized over the deck).
+    # With weights, the shuffle is a weighted random permutation
+    # (Efraimidis-Spirakis keys), so heavier countries tend to come first.
+    # Without an explicit rng only a seed is kept (a Mersenne Twister state is
+    # ~2.5 KB per session); each reshuffle derives its generator from it.
+    __slots__ = ("n", "rng", "seed", "shuffles", "weights", "order", "pos")
+
+    def __init__(self, n, rng=None, weights=None, seed=None):
+        if weights is not None and len(weights) != n:
+            raise ValueError("need one weight per country")
+        self.n = n
+        self.rng = rng
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self.shuffles = 0
+        self.weights = weights
+        self.order = array("H")
+        self.pos = 0
+
+    def _shuffle(self):
+        rng = self.rng or random.Random(f"{self.seed}:{self.shuffles}")
+        self.shuffles += 1
+        if self.weights is None:
+            order = list(range(self.n))
+            rng.shuffle(order)
+        else:
+            keys = [rng.random() ** (1.0 / w) if w > 0 else -1.0 for w in self.weights]
+            order = sorted(range(self.n), key=keys.__getitem__, reverse=True)
+        self.order = array("H" if self.n <= 0xFFFF else "L", order)
+        self.pos = 0
+
+    def draw(self):
+        if self.pos >= len(self.order):
+            self._shuffle()
+        i = self.order[self.pos]
+        self.pos += 1
+        return i
+
+
+def difficulty_weights(countries, difficulty_lists, tier_weights):
+    # e.g. tier_weights={"Easy": 3, "Medium": 2, "Hard": 1} for "All Countries"
+    tier = {}
+    for level, names in difficulty_lists.items():
+        if level in tier_weights:
+            for name in names:
+                tier.setdefault(name, tier_weights[level])
+    return [tier.get(c["name"]["common"], 1) for c in countries]
+
+
+# ==================== Game Logic ====================
+class Player:
+    __slots__ = ("name", "score", "rounds_played")
+
+    def __init__(self, name):
+        self.name = name
+        self.score = 0
+        self.rounds_played = 0
+
+    def add_score(self, pts):
+        self.score += pts
+        self.rounds_played += 1
+
+class Game:
+    # Per-session state is kept small: the country pool is a shared catalog
+    # sequence plus integer ids, clicks live in a flat array of doubles
+    __slots__ = ("players", "current_player_index", "target_score", "scoring", "countries", "ids",
+                 "code_to_name", "deck", "round_number", "country_index", "hint_index", "guess_count",
+                 "round_over", "message", "_guesses", "help_used", "max_rounds", "events")
+
+    def __init__(self, names, target, countries, rng=None, seed=None, weights=None, code_to_name=None,
+                 scoring="centroid", ids=None, max_rounds=None, events=None):
+        # countries: shared, not copied; ids: the indices into it to play
+        # (default: all of them); max_rounds: also over once every player
+        # has played that many rounds (daily challenge); events: optional
+        # callable(kind, fields) told about every move (events.py), not
+        # part of the saved state
+        if scoring not in SCORING_MODES:
+            raise ValueError(f"unknown scoring mode {scoring!r}")
+        self.players = [Player(n) for n in names]
+        self.current_player_index = 0
+        self.target_score = target
+        self.max_rounds = max_rounds
+        self.events = events
+        self.scoring = scoring
+        self.countries = countries
+        self.ids = array("H" if len(countries) <= 0xFFFF else "L", range(len(countries)) if ids is None else ids)
+        # Mapping für Nachbarn-Hints; pass the catalog-wide one (catalog.code_to_name),
+        # the round's countries alone miss neighbours from other difficulties
+        if code_to_name is None:
+            code_to_name = {c["cca3"]: c["name"]["common"] for c in countries if c.get("cca3")}
+        self.code_to_name = code_to_name
+        # Pass a seed for a reproducible round sequence
+        self.deck = RoundDeck(len(self.ids), rng, weights, seed)
+        self.round_number = 0
+        self.new_round()
+
+    @property
+    def country(self):
+        return self.countries[self.ids[self.country_index]]
+
+    @property
+    def guesses(self):
+        # Map clicks of this round as [(lat, lon), ...]
+        g = self._guesses
+        return [(g[k], g[k + 1]) for k in range(0, len(g), 2)]
+
+    def get_current_player(self):
+        return self.players[self.current_player_index]
+
+    def new_round(self):
+        self.country_index = self.deck.draw()
+        self.round_number += 1
+        self.hint_index = 1
+        self.guess_count = 0
+        self.round_over = False
+        self.message = ""
+        # Map clicks of this round and help circles used
+        self._guesses = array("d")
+        self.help_used = 0
+        if self.events is not None:
+            self._emit("round", pool=len(self.ids))
+
+    def get_hint(self, i):
+        return get_hint(self.country, i, self.code_to_name)
+
+    def round_points(self):
+        # 5 points with one hint, one less per extra hint, at least 1
+        return max(MAX_HINTS - (self.hint_index - 1), 1)
+
+    def use_help(self):
+        self.help_used += 1
+        if self.events is not None:
+            self._emit("help", n=self.help_used)
+
+    def _wrong(self):
+        self.guess_count += 1
+        if self.hint_index < MAX_HINTS:
+            self.hint_index += 1
+            if self.events is not None:
+                self._emit("hint", hint=self.hint_index)
+
+    def _emit(self, kind, **fields):
+        # Callers check self.events first: with logging off, not even the
+        # fields are built
+        self.events(kind, {"round": self.round_number, "country": self.country.get("cca3"),
+                           "player": self.get_current_player().name, "scoring": self.scoring, **fields})
+
+    def _outcome(self, result, pts):
+        # result: "hit", "close", "correct" (typed) or "miss"
+        if self.events is not None:
+            self._emit("outcome", result=result, points=pts, wrong=self.guess_count, hints=self.hint_index,
+                       help=self.help_used)
+
+    def process_guess(self, guess, names=None):
+        # names: name_index.NameIndex over self.countries (catalog.name_index()),
+        # accepts alt spellings, translations and small typos. A guess that
+        # fits several countries equally well ("Korea") must be unique to
+        # count: the player is asked to be more specific, at no cost.
+        if names is not None:
+            matched = names.match(guess)
+            if len(matched) > 1:
+                options = " or ".join(sorted({self.countries[i]["name"]["common"] for i in matched}))
+                self.message = f"❌ Ambiguous: {options}? Be more specific."
+                return
+            correct = matched == [self.ids[self.country_index]]
+        else:
+            correct = guess.lower().strip() == self.country["name"]["common"].lower().strip()
+        if self.events is not None:
+            self._emit("guess", text=guess, ok=correct, hint=self.hint_index)
+        if correct:
+            pts = self.round_points()
+            self.get_current_player().add_score(pts)
+            self.message = f"✅ Correct! +{pts} points."
+            self.round_over = True
+            self._outcome("correct", pts)
+        else:
+            self._wrong()
+            if self.hint_index > MAX_HINTS or self.guess_count >= MAX_GUESSES:
+                self.get_current_player().add_score(0)
+                self.message = f"❌ Wrong. Answer: {self.country['name']['common']}."
+                self.round_over = True
+                self._outcome("miss", 0)
+            else:
+                self.message = "❌ Wrong, try again!"
+
+    def process_click(self, lat, lon, locator, distance_km=None):
+        # locator: geo.CountryLocator (or anything with contains/centroid/edge_km)
+        if distance_km is None:
+            from distance import vincenty_km_scalar as distance_km
+        name = self.country["name"]["common"]
+        if self.scoring == "edge":
+            dist = locator.edge_km(name, lat, lon)
+            self.score_click(lat, lon, dist == 0.0, dist)
+            return
+        inside = locator.contains(name, lat, lon)
+        dist = None
+        if not inside:
+            correct = locator.centroid(name)
+            if correct:
+                dist = distance_km(lat, lon, *correct)
+        self.score_click(lat, lon, inside, dist)
+
+    def score_click(self, lat, lon, inside, dist):
+        # Apply an already evaluated click (e.g. from eval_server);
+        # dist is km to the target (per self.scoring), None if unknown
+        name = self.country["name"]["common"]
+        self._guesses.extend((lat, lon))
+        if self.events is not None:
+            self._emit("guess", lat=round(lat, 4), lon=round(lon, 4), inside=bool(inside),
+                       km=None if dist is None else round(float(dist), 1),
+                       ok=bool(inside) or (dist is not None and dist <= CLOSE_HIT_KM), hint=self.hint_index)
+
+        if inside:
+            pts = max(self.round_points() - HELP_PENALTY * self.help_used, 0)
+            self.get_current_player().add_score(pts)
+            self.message = f"🎉 Hit! +{pts} points."
+            self.round_over = True
+            self._outcome("hit", pts)
+            return
+
+        if dist is None:
+            return
+        if dist <= CLOSE_HIT_KM:
+            pts = max(self.round_points() - HELP_PENALTY * self.help_used, 0)  # Deduct points for help usage
+            self.get_current_player().add_score(pts)
+            self.message = f"🎉 Close hit! Distance: {int(dist)} km → +{pts} points."
+            self.round_over = True
+            self._outcome("close", pts)
+        else:
+            self._wrong()
+            self.message = f"❌ Wrong – {int(dist)} km away."
+            if self.guess_count >= MAX_GUESSES:
+                self.get_current_player().add_score(0)
+                self.message += f" Round over. Answer: {name}."
+                self.round_over = True
+                self._outcome("miss", 0)
+
+    # ---------- persistence ----------
+    def to_state(self):
+        # JSON-ready snapshot of the game. Countries are stored as cca3 codes,
+        # so it can be restored against a newer catalog or on another replica.
+        deck = self.deck
+        return {
+            "players": [[p.name, p.score, p.rounds_played] for p in self.players],
+            "turn": self.current_player_index,
+            "target": self.target_score,
+            "max_rounds": self.max_rounds,
+            "scoring": self.scoring,
+            "pool": [self.countries[i].get("cca3") for i in self.ids],
+            "deck": [deck.seed, deck.shuffles, deck.order.tolist(), deck.pos, deck.weights],
+            "round": [self.round_number, self.country_index, self.hint_index, self.guess_count,
+                      self.round_over, self.message, self._guesses.tolist(), self.help_used],
+        }
+
+    @classmethod
+    def from_state(cls, state, countries, code_to_name=None):
+        # Inverse of to_state; KeyError if a country left the catalog
+        by_code = {c.get("cca3"): i for i, c in enumerate(countries)}
+        seed, shuffles, order, pos, weights = state["deck"]
+        game = cls(["_"], state["target"], countries, seed=seed, weights=weights, code_to_name=code_to_name,
+                   scoring=state["scoring"], ids=[by_code[code] for code in state["pool"]],
+                   max_rounds=state.get("max_rounds"))
+        game.players = [Player(name) for name, _, _ in state["players"]]
+        for p, (_, score, rounds) in zip(game.players, state["players"]):
+            p.score, p.rounds_played = score, rounds
+        game.current_player_index = state["turn"]
+        game.deck.shuffles, game.deck.order, game.deck.pos = shuffles, array(game.deck.order.typecode, order), pos
+        (game.round_number, game.country_index, game.hint_index, game.guess_count,
+         game.round_over, game.message, guesses, game.help_used) = state["round"]
+        game._guesses = array("d", guesses)
+        return game
+
+    def next_player(self):
+        self.current_player_index = (self.current_player_index + 1) % len(self.players)
+
+    def is_game_over(self):
+        hit = any(p.score >= self.target_score for p in self.players)
+        same = len({p.rounds_played for p in self.players}) == 1
+        done = self.max_rounds is not None and self.players[0].rounds_played >= self.max_rounds
+        return (hit or done) and same
+
+    def get_winner(self):
+        max_s = max(p.score for p in self.players)
+        tops = [p for p in self.players if p.score == max_s]
+        return tops if len(tops) > 1 else tops[0]
+
+
+# ==================== Simulation ====================
+def simulate_rounds(n, countries, locator, rng=None, spread_km=600, help_rate=0.0, scoring="centroid", events=None,
+                    batch=4096):
+    # Headless bot: each click lands around the target centroid with
+    # Gaussian noise of `spread_km`. Returns the list of round points.
+    # Clicks are drawn and evaluated `batch` rounds at a time in one
+    # locator.evaluate call (all MAX_GUESSES a round may need); the game
+    # only applies them through score_click, as for eval_server results.
+    import copy
+    import numpy as np
+
+    rng = rng or random.Random()
+    gen = np.random.default_rng(rng.getrandbits(64))
+    # only countries the locator knows can end a round by click
+    countries = [c for c in countries if locator.centroid(c["name"]["common"])]
+    rows = np.array([locator.row(c["name"]["common"]) for c in countries], dtype=np.int64)
+    game = Game(["bot"], float("inf"), countries, rng, scoring=scoring, events=events)
+    spread_deg = spread_km / 111.0
+    points = []
+    for start in range(0, n, batch):
+        k = min(batch, n - start)
+        # The deck doesn't depend on outcomes: a copy of it names the next rounds
+        ahead = copy.deepcopy(game.deck)
+        targets = rows[[game.country_index] + [ahead.draw() for _ in range(k - 1)]]
+        center = locator.centroids[targets]
+        lats = np.clip(gen.normal(center[:, :1], spread_deg, (k, MAX_GUESSES)), -90.0, 90.0)
+        lons = (gen.normal(center[:, 1:], spread_deg, (k, MAX_GUESSES)) + 180.0) % 360.0 - 180.0
+        inside, dist = locator.evaluate(np.repeat(targets, MAX_GUESSES), lats.ravel(), lons.ravel(), mode=scoring)
+        helps = (gen.random((k, MAX_GUESSES)) < help_rate).tolist()
+        for r_lats, r_lons, r_inside, r_dist, r_help in zip(lats.tolist(), lons.tolist(), inside.reshape(k, -1).tolist(),
+                                                             dist.reshape(k, -1).tolist(), helps):
+            before = game.players[0].score
+            j = 0
+            while not game.round_over:
+                if j and r_help[j]:
+                    game.use_help()
+                game.score_click(r_lats[j], r_lons[j], r_inside[j], r_dist[j])
+                j += 1
+            points.append(game.players[0].score - before)
+            game.new_round()
+    return points
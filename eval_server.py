@@ -0,0 +1,136 @@
+# ==================== Evaluation Service ====================
+# Guess evaluation (hit test + distance to the target) off the Streamlit
+# script threads. Requests from all sessions are collected into small
+# batches and handed to a pool of worker processes that each own a copy
+# of the geometry index, so throughput scales across cores instead of
+# serializing on the GIL.
+#
+#   service = EvalService(workers=4)
+#   inside, dist_km = service.evaluate("Germany", 52.5, 13.4)
+#   inside, dist_km = service.evaluate("Germany", 52.5, 13.4, mode="edge")
+#
+# With workers=0 everything runs inline in the calling thread.
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import get_all_start_methods, get_context
+
+import numpy as np
+
+_locator = None
+
+
+def _worker_init():
+    global _locator
+    import geo
+
+    _locator = geo.load_locator()
+
+
+def _evaluate_one(locator, name, lat, lon, mode="centroid"):
+    from distance import vincenty_km_scalar
+
+    correct = locator.centroid(name)
+    if correct is None:
+        return False, None
+    if mode == "edge":
+        dist = locator.edge_km(name, lat, lon)
+        return dist == 0.0, dist
+    return locator.contains(name, lat, lon), vincenty_km_scalar(lat, lon, *correct)
+
+
+def _evaluate_batch(batch, locator=None):
+    # batch: list of (country name, lat, lon, mode) -> list of (inside, km or None)
+    locator = locator or _locator
+    if len(batch) < 8:
+        # NumPy call overhead dominates tiny batches: use the scalar path
+        return [_evaluate_one(locator, *req) for req in batch]
+    out = [(False, None)] * len(batch)
+    for mode in {req[3] for req in batch}:
+        known = [k for k, req in enumerate(batch) if req[3] == mode and locator.row(req[0]) is not None]
+        if not known:
+            continue
+        lats = np.array([batch[k][1] for k in known], dtype=float)
+        lons = np.array([batch[k][2] for k in known], dtype=float)
+        inside, dist = locator.evaluate([locator.row(batch[k][0]) for k in known], lats, lons, mode)
+        for j, k in enumerate(known):
+            out[k] = (bool(inside[j]), float(dist[j]))
+    return out
+
+
+def evaluate_local(locator, name, lats, lons, mode="centroid"):
+    # evaluate_many's answer computed in the calling thread, e.g. when the
+    # worker pool doesn't answer in time
+    return _evaluate_batch([(name, lat, lon, mode) for lat, lon in zip(lats, lons)], locator)
+
+
+class EvalService:
+    def __init__(self, workers=None, max_batch=256, max_wait=0.002, locator=None):
+        self.workers = os.cpu_count() if workers is None else workers
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        if self.workers <= 0:
+            if locator is None:
+                import geo
+
+                locator = geo.load_locator()
+            self._locator = locator
+            return
+        # Not fork: the Streamlit server has many threads, and a forked child
+        # could inherit a lock one of them holds. Workers load their own
+        # locator anyway, so nothing is lost.
+        method = "forkserver" if "forkserver" in get_all_start_methods() else "spawn"
+        self._pool = get_context(method).Pool(self.workers, initializer=_worker_init)
+        self._queue = queue.Queue()
+        self._batcher = threading.Thread(target=self._batch_loop, daemon=True, name="eval-batcher")
+        self._batcher.start()
+
+    # ---------- client API ----------
+    def submit(self, name, lat, lon, mode="centroid"):
+        # mode: "centroid" (km to the centroid) or "edge" (km to the nearest border)
+        future = Future()
+        if self.workers <= 0:
+            future.set_result(_evaluate_batch([(name, lat, lon, mode)], self._locator)[0])
+        else:
+            self._queue.put(((name, lat, lon, mode), future))
+        return future
+
+    def evaluate(self, name, lat, lon, mode="centroid", timeout=10):
+        return self.submit(name, lat, lon, mode).result(timeout)
+
+    def evaluate_many(self, name, lats, lons, mode="centroid", timeout=10):
+        futures = [self.submit(name, lat, lon, mode) for lat, lon in zip(lats, lons)]
+        return [f.result(timeout) for f in futures]
+
+    def close(self):
+        if self.workers > 0:
+            self._queue.put(None)
+            self._pool.terminate()
+
+    # ---------- batching ----------
+    def _batch_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            items = [item]
+            # collect whatever else arrives within max_wait
+            deadline = time.monotonic() + self.max_wait
+            try:
+                while len(items) < self.max_batch:
+                    nxt = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                    if nxt is None:
+                        self._queue.put(None)
+                        break
+                    items.append(nxt)
+            except queue.Empty:
+                pass
+            futures = [f for _, f in items]
+            self._pool.apply_async(
+                _evaluate_batch, ([req for req, _ in items],),
+                callback=lambda res, futures=futures: [f.set_result(r) for f, r in zip(futures, res)],
+                error_callback=lambda exc, futures=futures: [f.set_exception(exc) for f in futures],
+            )
@@ -0,0 +1,138 @@
+# ==================== Game Event Log ====================
+# Append-only log of what happens in games: round starts, guesses (clicks
+# with coordinates and distance, typed names), hints revealed, help circles
+# and round outcomes (see engine.Game._emit). Emitting only puts a dict on a
+# queue; a writer thread batches records into JSON lines under data/events/,
+# one file per UTC day and process (no interleaved appends across replicas).
+# analytics.py reads the files back in a single streaming pass.
+#
+#   log = EventLog()
+#   game = Game(..., events=log.sink(sid="..."))
+#
+#   CG_EVENT_LOG=/path/to/dir   (default: data/events)
+#   CG_EVENT_LOG=off            (no log)
+#
+# One record per line, short keys: {"t": unix time, "k": kind, ...context,
+# ...fields}, None values left out. Records are dropped (and counted) if the
+# writer falls behind by more than `max_queue`, rather than blocking the game.
+
+import datetime
+import json
+import os
+import queue
+import threading
+import time
+
+EVENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "events")
+
+
+def event_files(directory=EVENT_DIR, since=None):
+    # Log files in day order, optionally from day `since` (YYYY-MM-DD) on
+    try:
+        names = sorted(n for n in os.listdir(directory) if n.startswith("events-") and n.endswith(".jsonl"))
+    except OSError:
+        return []
+    if since:
+        names = [n for n in names if n[len("events-"):len("events-") + 10] >= since]
+    return [os.path.join(directory, n) for n in names]
+
+
+def read_events(paths):
+    # One dict per line, streamed; a torn last line (writer still busy) is skipped
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+class EventLog:
+    def __init__(self, directory=EVENT_DIR, batch_size=512, flush_interval=1.0, max_queue=100_000):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.dropped = 0
+        self.written = 0
+        # SimpleQueue: a lock-free put from the script threads (queue.Queue
+        # takes a Condition per call), bounded via qsize() in emit
+        self._queue = queue.SimpleQueue()
+        self._encode = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False).encode
+        self._day = (0.0, 0.0, None)  # [start, end) of the current UTC day, its date
+        os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, daemon=True, name="event-log")
+        self._thread.start()
+
+    # ---------- producer side (script threads) ----------
+    def emit(self, kind, fields):
+        if self._queue.qsize() >= self.max_queue:
+            self.dropped += 1
+            return
+        record = {"t": round(time.time(), 3), "k": kind}
+        record.update((k, v) for k, v in fields.items() if v is not None)
+        self._queue.put(record)
+
+    def sink(self, **context):
+        # callable(kind, fields) for engine.Game(events=...), adding `context`
+        # (session id, difficulty, ...) to every record
+        def emit(kind, fields):
+            self.emit(kind, {**context, **fields})
+        return emit
+
+    def flush(self, timeout=None):
+        # Blocks until everything emitted so far is on disk
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    # ---------- writer thread ----------
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            records = []
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    self._write(records)
+                    records = []
+                    item.set()
+                else:
+                    records.append(item)
+            self._write(records)
+
+    def _day_of(self, t):
+        start, end, day = self._day
+        if not start <= t < end:
+            date = datetime.datetime.fromtimestamp(t, datetime.timezone.utc).date()
+            start = datetime.datetime(date.year, date.month, date.day, tzinfo=datetime.timezone.utc).timestamp()
+            self._day = start, end, day = start, start + 86400, date.isoformat()
+        return day
+
+    def _write(self, records):
+        if not records:
+            return
+        by_day = {}
+        for record in records:
+            by_day.setdefault(self._day_of(record["t"]), []).append(self._encode(record))
+        try:
+            for day, lines in by_day.items():
+                path = os.path.join(self.directory, f"events-{day}-{os.getpid()}.jsonl")
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write("\n".join(lines) + "\n")
+        except OSError:
+            self.dropped += len(records)
+            return
+        self.written += len(records)
+
+
+def open_log(path=None):
+    # EventLog per CG_EVENT_LOG, None if logging is off
+    path = path or os.environ.get("CG_EVENT_LOG") or EVENT_DIR
+    return None if path == "off" else EventLog(path)
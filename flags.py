@@ -0,0 +1,115 @@
+# ==================== Flag Cache ====================
+# Flags for hint 3, downloaded once, downsized and stored as PNG under
+# data/flags/, then served from an in-memory LRU. Prefetching runs in a
+# thread pool when a game starts, so showing the hint never hits the network.
+
+import io
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+FLAG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "flags")
+FLAG_WIDTH = 300  # 2x the 150 px display width
+
+
+def flag_url(country):
+    flag = country.get("flags", {})
+    return flag.get("png") or flag.get("svg") or ""
+
+
+class FlagCache:
+    def __init__(self, directory=FLAG_DIR, width=FLAG_WIDTH, max_items=64, workers=8):
+        self.directory = directory
+        self.width = width
+        self.max_items = max_items
+        self._mem = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="flag-prefetch")
+        os.makedirs(directory, exist_ok=True)
+        # Source URL + HTTP validators per flag, for conditional refreshes
+        self.meta_path = os.path.join(directory, "index.json")
+        try:
+            with open(self.meta_path) as f:
+                self.meta = json.load(f)
+        except (OSError, ValueError):
+            self.meta = {}
+
+    def path(self, code):
+        return os.path.join(self.directory, f"{code}.png")
+
+    def _remember(self, code, data):
+        with self._lock:
+            self._mem[code] = data
+            self._mem.move_to_end(code)
+            while len(self._mem) > self.max_items:
+                self._mem.popitem(last=False)
+
+    def get(self, country):
+        # PNG bytes if cached (memory, then disk), else None; never downloads
+        code = country.get("cca3")
+        if not code:
+            return None
+        with self._lock:
+            data = self._mem.get(code)
+            if data is not None:
+                self._mem.move_to_end(code)
+                return data
+        try:
+            with open(self.path(code), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        self._remember(code, data)
+        return data
+
+    def store(self, code, raw, meta=None):
+        # Downsize downloaded image bytes and persist them as PNG
+        from PIL import Image
+
+        img = Image.open(io.BytesIO(raw))
+        img.thumbnail((self.width, self.width))
+        buf = io.BytesIO()
+        img.save(buf, format="PNG", optimize=True)
+        data = buf.getvalue()
+
+        tmp = f"{self.path(code)}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self.path(code))
+        self._remember(code, data)
+        if meta is not None:
+            with self._lock:
+                self.meta[code] = meta
+        return data
+
+    def save_meta(self):
+        with self._lock:
+            snapshot = dict(self.meta)
+        tmp = f"{self.meta_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp, self.meta_path)
+
+    def fetch(self, country, timeout=10):
+        import requests
+
+        code, url = country.get("cca3"), flag_url(country)
+        if not code or not url.endswith(".png"):
+            return None
+        r = requests.get(url, timeout=timeout)
+        r.raise_for_status()
+        return self.store(code, r.content, {"url": url, "etag": r.headers.get("ETag"),
+                                            "last_modified": r.headers.get("Last-Modified")})
+
+    def _fetch_quietly(self, country):
+        try:
+            return self.fetch(country)
+        except (OSError, ValueError):
+            return None  # hint falls back to the remote URL
+
+    def prefetch(self, countries):
+        # Queue downloads for flags not on disk yet; returns immediately
+        missing = [c for c in countries if c.get("cca3") and not os.path.exists(self.path(c["cca3"]))]
+        return [self._pool.submit(self._fetch_quietly, c) for c in missing]
@@ -0,0 +1,281 @@
+# ==================== World Geometry ====================
+# Precomputed country geometry artifact + spatial index over it.
+# Build the artifact (needs geopandas) with:  python geo.py build
+# At runtime only numpy + shapely are needed to load it.
+
+import json
+import math
+import os
+import sys
+
+import numpy as np
+import shapely
+from shapely.strtree import STRtree
+
+from distance import geodesic_km, lambert_km, lambert_km_scalar
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+SHAPEFILE_PATH = os.path.join(DATA_DIR, "ne_110m_admin_0_countries", "ne_110m_admin_0_countries.shp")
+WORLD_PATH = os.path.join(DATA_DIR, "world.npz")
+WORLD_VERSION = 3
+# Simplification levels of the geometry pyramid (degrees), coarse -> fine
+SIMPLIFY_TOLERANCES = (0.5, 0.25, 0.1)
+# Max spacing of the border vertices used for distance-to-border (degrees);
+# the nearest vertex is at most half a step (~6 km) off the nearest point
+EDGE_STEP = 0.1
+EDGE_CHUNK = 32
+
+
+# ==================== Country Locator ====================
+# Answers "which country is this (lat, lon) in" and "is this point in
+# country X", for single points and for arrays of points.
+# Per country it keeps a geometry pyramid: bbox -> convex hull ->
+# simplified polygons -> full polygon. Hit tests reject on bbox and hull
+# before touching the exact geometry; map outlines use a simplified level.
+# For distance-to-border, the densified border vertices of all countries
+# are kept as unit vectors in fixed-size chunks (`edge_chunks`, country i owns
+# chunks edge_offsets[i]:edge_offsets[i + 1]); a single click is one dot
+# product against its target's vertices, even for the longest borders.
+class CountryLocator:
+    def __init__(self, names, geometries, centroids, codes=None, bounds=None, hulls=None, simplified=None,
+                 edges=None):
+        self.names = list(names)
+        self.codes = list(codes) if codes is not None else [None] * len(self.names)
+        self.geometries = np.asarray(geometries, dtype=object)
+        # centroids as (lat, lon) rows, aligned with names
+        self.centroids = np.asarray(centroids, dtype=float).reshape(-1, 2)
+        self.bounds = shapely.bounds(self.geometries) if bounds is None else np.asarray(bounds, dtype=float)
+        self._bbox = [tuple(b) for b in self.bounds.tolist()]  # plain floats for scalar checks
+        self.hulls = shapely.convex_hull(self.geometries) if hulls is None else np.asarray(hulls, dtype=object)
+        if simplified is None:
+            simplified = {tol: shapely.simplify(self.geometries, tol, preserve_topology=True)
+                          for tol in SIMPLIFY_TOLERANCES}
+        self.simplified = simplified
+        self.edge_chunks, self.edge_offsets = _border_chunks(self.geometries) if edges is None else edges
+        # Per country a flat (n, 3) view of its border vertices
+        self._edge_verts = [self.edge_chunks[c0:c1].reshape(-1, 3)
+                            for c0, c1 in zip(self.edge_offsets[:-1].tolist(), self.edge_offsets[1:].tolist())]
+        self._geojson = {}
+        self.index = {n.lower(): i for i, n in enumerate(self.names)}
+        shapely.prepare(self.geometries)
+        shapely.prepare(self.hulls)
+        self.tree = STRtree(self.geometries)
+
+    def row(self, name):
+        return self.index.get(name.lower())
+
+    def centroid(self, name):
+        i = self.row(name)
+        if i is None:
+            return None
+        return [float(self.centroids[i, 0]), float(self.centroids[i, 1])]
+
+    def geometry(self, name):
+        i = self.row(name)
+        return None if i is None else self.geometries[i]
+
+    # ---------- rendering ----------
+    def outline_geojson(self, name, zoom):
+        # Simplified outline as a GeoJSON string, detail matched to the zoom:
+        # the coarsest level whose tolerance is below one screen pixel
+        i = self.row(name)
+        if i is None:
+            return None
+        deg_per_px = 360.0 / (256 * 2 ** zoom)
+        fitting = [t for t in sorted(self.simplified, reverse=True) if t <= deg_per_px]
+        tol = fitting[0] if fitting else None
+        key = (i, tol)
+        if key not in self._geojson:
+            geom = self.geometries[i] if tol is None else self.simplified[tol][i]
+            self._geojson[key] = shapely.to_geojson(geom)
+        return self._geojson[key]
+
+    def world_geojson(self, tol=0.25):
+        # Every country at one simplification level as a GeoJSON
+        # FeatureCollection dict, feature k = row k, coordinates rounded to
+        # 0.01° (display only), for maps that draw all outlines at once
+        key = ("world", tol)
+        if key not in self._geojson:
+            geoms = shapely.transform(self.simplified[tol], lambda xy: np.round(xy, 2))
+            self._geojson[key] = {"type": "FeatureCollection", "features": [
+                {"type": "Feature", "properties": {"row": i, "code": self.codes[i]}, "geometry": json.loads(g)}
+                for i, g in enumerate(shapely.to_geojson(geoms))
+            ]}
+        return self._geojson[key]
+
+    # ---------- single point ----------
+    def locate(self, lat, lon):
+        hits = self.tree.query(shapely.points(lon, lat), predicate="intersects")
+        return self.names[hits[0]] if len(hits) else None
+
+    def contains(self, name, lat, lon):
+        i = self.row(name)
+        if i is None:
+            return False
+        minx, miny, maxx, maxy = self._bbox[i]
+        if not (minx <= lon <= maxx and miny <= lat <= maxy):
+            return False
+        if not shapely.contains_xy(self.hulls[i], lon, lat):
+            return False
+        return bool(shapely.contains_xy(self.geometries[i], lon, lat))
+
+    # ---------- batch ----------
+    def locate_many(self, lats, lons):
+        # Row index of the containing country per point, -1 for open sea
+        pts = shapely.points(np.asarray(lons, dtype=float), np.asarray(lats, dtype=float))
+        out = np.full(len(pts), -1, dtype=np.int64)
+        pt_idx, geom_idx = self.tree.query(pts, predicate="intersects")
+        out[pt_idx] = geom_idx
+        return out
+
+    def contains_many(self, name, lats, lons):
+        lats = np.asarray(lats, dtype=float)
+        i = self.row(name)
+        if i is None:
+            return np.zeros(lats.shape, dtype=bool)
+        return self._contains_rows(np.full(lats.shape, i), lats, np.asarray(lons, dtype=float))
+
+    def _contains_rows(self, rows, lats, lons):
+        # bbox fast-reject for the whole batch, exact test only for candidates
+        b = self.bounds[rows]
+        out = (lons >= b[:, 0]) & (lats >= b[:, 1]) & (lons <= b[:, 2]) & (lats <= b[:, 3])
+        cand = np.flatnonzero(out)
+        if cand.size:
+            out[cand] = shapely.contains_xy(self.geometries[rows[cand]], lons[cand], lats[cand])
+        return out
+
+    def evaluate(self, rows, lats, lons, mode="centroid"):
+        # Click i against target country rows[i]: (inside, km to the target),
+        # measured to its centroid or (mode="edge") to its nearest border point
+        rows = np.asarray(rows, dtype=np.int64)
+        lats, lons = np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)
+        inside = self._contains_rows(rows, lats, lons)
+        if mode == "edge":
+            tlats, tlons = np.zeros(len(rows)), np.zeros(len(rows))
+            xyz = _unit_vectors(lats, lons, np.float32)
+            for i in np.unique(rows):
+                sel = np.flatnonzero(rows == i)
+                tlats[sel], tlons[sel] = self._nearest_vertices(i, xyz[sel])
+            dist = np.where(inside, 0.0, lambert_km(lats, lons, tlats, tlons))  # as edge_km
+        else:
+            dist = geodesic_km(lats, lons, self.centroids[rows, 0], self.centroids[rows, 1])
+        return inside, dist
+
+    # ---------- distance to the border ----------
+    def _nearest_vertices(self, i, xyz):
+        # (lats, lons) of the border vertex of row i closest to each unit
+        # vector: the largest dot product is the smallest great-circle angle
+        verts = self.edge_chunks[self.edge_offsets[i]:self.edge_offsets[i + 1]].reshape(-1, 3)
+        best = verts[np.argmax(xyz @ verts.T, axis=1)].astype(float)
+        return np.degrees(np.arcsin(np.clip(best[:, 2], -1.0, 1.0))), np.degrees(np.arctan2(best[:, 1], best[:, 0]))
+
+    def _nearest_vertex(self, i, lat, lon):
+        # Single-click variant. Per click the cost is the number of NumPy
+        # calls, not the arithmetic, so no pruning: one dot product over all
+        # the vertices beats skipping chunks by bounding cap even for
+        # Antarctica (~10k vertices)
+        la, lo = math.radians(lat), math.radians(lon)
+        cos_la = math.cos(la)
+        q = np.array((cos_la * math.cos(lo), cos_la * math.sin(lo), math.sin(la)), dtype=np.float32)
+        verts = self._edge_verts[i]
+        x, y, z = verts[verts.dot(q).argmax()].tolist()
+        return math.degrees(math.asin(max(min(z, 1.0), -1.0))), math.degrees(math.atan2(y, x))
+
+    def edge_km(self, name, lat, lon):
+        # Ellipsoidal km from a point to the nearest border point of a
+        # country, 0 inside it, None for unknown countries. Lambert's formula
+        # rather than Vincenty: within a metre at these ranges, and the
+        # nearest vertex is up to ~6 km approximate anyway
+        i = self.row(name)
+        if i is None:
+            return None
+        if self.contains(name, lat, lon):
+            return 0.0
+        return lambert_km_scalar(lat, lon, *self._nearest_vertex(i, lat, lon))
+
+
+def _unit_vectors(lats, lons, dtype=float):
+    lat, lon = np.radians(lats), np.radians(lons)
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)]).astype(dtype)
+
+
+def _border_chunks(geometries):
+    # Border vertices per country, segmentized to EDGE_STEP, as float32 unit
+    # vectors in chunks of EDGE_CHUNK consecutive vertices (the last chunk of
+    # a country padded with its last vertex) + per-country chunk offsets
+    chunks, counts = [], [0]
+    for geom in geometries:
+        c = shapely.get_coordinates(shapely.segmentize(shapely.boundary(geom), EDGE_STEP))
+        n = -(-len(c) // EDGE_CHUNK)
+        c = np.vstack([c, np.repeat(c[-1:], n * EDGE_CHUNK - len(c), axis=0)])
+        chunks.append(_unit_vectors(c[:, 1], c[:, 0], np.float32).reshape(n, EDGE_CHUNK, 3))
+        counts.append(n)
+    return np.concatenate(chunks), np.cumsum(counts).astype(np.int64)
+
+
+# ==================== Artifact ====================
+def _load_shapefile(shapefile_path=SHAPEFILE_PATH):
+    import geopandas as gpd
+
+    # Only the two attribute columns we need, not all ~170 DBF fields
+    gdf = gpd.read_file(shapefile_path, columns=["NAME", "ADM0_A3"])
+    if gdf.crs and gdf.crs.to_epsg() != 4326:
+        gdf = gdf.to_crs(epsg=4326)
+    # Centroid in Web Mercator (as shown on the map), stored as lat/lon
+    centroid = gdf.to_crs(epsg=3857).geometry.centroid.to_crs(epsg=4326)
+    return CountryLocator(gdf["NAME"], gdf.geometry.values, np.column_stack([centroid.y, centroid.x]), gdf["ADM0_A3"])
+
+
+def _pack(geoms):
+    wkb = [shapely.to_wkb(g) for g in geoms]
+    return np.frombuffer(b"".join(wkb), dtype=np.uint8), np.cumsum([0] + [len(b) for b in wkb]).astype(np.int64)
+
+
+def _unpack(buf, offsets):
+    buf = buf.tobytes()
+    return shapely.from_wkb([buf[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)])
+
+
+def build_world_artifact(shapefile_path=SHAPEFILE_PATH, out=WORLD_PATH):
+    loc = _load_shapefile(shapefile_path)
+    arrays = {}
+    arrays["wkb"], arrays["offsets"] = _pack(loc.geometries)
+    arrays["hull_wkb"], arrays["hull_offsets"] = _pack(loc.hulls)
+    for k, tol in enumerate(SIMPLIFY_TOLERANCES):
+        arrays[f"simple{k}_wkb"], arrays[f"simple{k}_offsets"] = _pack(loc.simplified[tol])
+    tmp = f"{out}.tmp.npz"
+    np.savez(
+        tmp,
+        version=np.int64(WORLD_VERSION),
+        names=np.array(loc.names, dtype=str),
+        codes=np.array(loc.codes, dtype=str),
+        centroids=loc.centroids,
+        bounds=loc.bounds,
+        tolerances=np.array(SIMPLIFY_TOLERANCES),
+        edge_chunks=loc.edge_chunks,
+        edge_offsets=loc.edge_offsets,
+        **arrays,
+    )
+    os.replace(tmp, out)
+    return out
+
+
+def load_locator(path=WORLD_PATH):
+    if not os.path.exists(path):
+        # No artifact built yet: fall back to the (slow) shapefile path
+        return _load_shapefile()
+    with np.load(path) as z:
+        if int(z["version"]) != WORLD_VERSION:
+            return _load_shapefile()
+        simplified = {float(tol): _unpack(z[f"simple{k}_wkb"], z[f"simple{k}_offsets"])
+                      for k, tol in enumerate(z["tolerances"])}
+        return CountryLocator(z["names"].tolist(), _unpack(z["wkb"], z["offsets"]), z["centroids"],
+                              z["codes"].tolist(), z["bounds"], _unpack(z["hull_wkb"], z["hull_offsets"]),
+                              simplified, (z["edge_chunks"], z["edge_offsets"]))
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["build"]:
+        print(f"Wrote {build_world_artifact()}")
+    else:
+        print("usage: python geo.py build")
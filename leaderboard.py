@@ -0,0 +1,175 @@
+# ==================== Leaderboard Store ====================
+# SQLite in WAL mode: many sessions can add results concurrently without
+# lost updates, and the top-N comes straight off an index on the average.
+# The legacy leaderboard.json is imported once when the database is created.
+# Daily challenge results (daily.py) go to their own table, first completed
+# run per player, day and difficulty.
+# Reads are served from a process-wide cache that writes invalidate; writes
+# from other processes show up after at most `max_age` seconds.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(BASE_DIR, "leaderboard.db")
+LEGACY_JSON_PATH = os.path.join(BASE_DIR, "leaderboard.json")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leaderboard (
+    name TEXT PRIMARY KEY,
+    total_points INTEGER NOT NULL DEFAULT 0,
+    total_rounds INTEGER NOT NULL DEFAULT 0,
+    avg REAL
+);
+DROP INDEX IF EXISTS leaderboard_avg;
+CREATE INDEX IF NOT EXISTS leaderboard_rank ON leaderboard(avg DESC, name);
+CREATE TABLE IF NOT EXISTS daily_scores (
+    day TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    name TEXT NOT NULL,
+    points INTEGER NOT NULL,
+    rounds INTEGER NOT NULL,
+    PRIMARY KEY (day, difficulty, name)
+);
+CREATE INDEX IF NOT EXISTS daily_rank ON daily_scores(day, difficulty, points DESC, name);
+"""
+
+UPSERT = """
+INSERT INTO leaderboard (name, total_points, total_rounds, avg)
+VALUES (?1, ?2, ?3, CAST(?2 AS REAL) / NULLIF(?3, 0))
+ON CONFLICT(name) DO UPDATE SET
+    total_points = total_points + excluded.total_points,
+    total_rounds = total_rounds + excluded.total_rounds,
+    avg = CAST(total_points + excluded.total_points AS REAL) / NULLIF(total_rounds + excluded.total_rounds, 0)
+"""
+
+# The day's sequence is the same on every replay, so only the first
+# completed run counts; later ones would already know the answers
+DAILY_INSERT = """
+INSERT INTO daily_scores (day, difficulty, name, points, rounds) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT(day, difficulty, name) DO NOTHING
+"""
+
+RANKED = "FROM leaderboard WHERE total_rounds > 0"
+
+
+class LeaderboardStore:
+    def __init__(self, path=DB_PATH, legacy_json=LEGACY_JSON_PATH, max_age=30):
+        self.path = path
+        self.max_age = max_age
+        self._local = threading.local()
+        self._cache_lock = threading.Lock()
+        self._cache = {}
+        self._generation = 0
+        conn = self._conn()
+        with conn:
+            conn.executescript(SCHEMA)
+        if legacy_json and os.path.exists(legacy_json):
+            self._import_legacy(legacy_json)
+
+    def _conn(self):
+        # sqlite3 connections are per thread; Streamlit runs sessions on many
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _import_legacy(self, legacy_json):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            empty = conn.execute("SELECT COUNT(*) FROM leaderboard").fetchone()[0] == 0
+            if empty:
+                with open(legacy_json, "r") as f:
+                    lb = json.load(f)
+                conn.executemany(UPSERT, [(n, d["total_points"], d["total_rounds"]) for n, d in lb.items()])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def add_results(self, results):
+        # results: iterable of (name, points, rounds), applied in one transaction
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(UPSERT, list(results))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self.invalidate()
+
+    def add_daily_results(self, day, difficulty, results):
+        # results: iterable of (name, points, rounds) for one daily challenge
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(DAILY_INSERT, [(day, difficulty, n, p, r) for n, p, r in results])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self.invalidate()
+
+    # ---------- cache ----------
+    def invalidate(self):
+        with self._cache_lock:
+            self._generation += 1
+            self._cache.clear()
+
+    def _cached(self, key, compute):
+        now = time.monotonic()
+        with self._cache_lock:
+            hit = self._cache.get(key)
+            generation = self._generation
+        if hit is not None and now - hit[0] < self.max_age:
+            return hit[1]
+        value = compute()
+        with self._cache_lock:
+            # don't store a result computed before a concurrent write
+            if generation == self._generation:
+                self._cache[key] = (now, value)
+        return value
+
+    # ---------- reads ----------
+    def top(self, n=5):
+        # [(name, avg points/round)], best first
+        return self.page(0, n)
+
+    def page(self, offset, limit):
+        # Walks the avg index: O(offset + limit), no full sort
+        return self._cached(("page", offset, limit), lambda: self._conn().execute(
+            f"SELECT name, avg {RANKED} ORDER BY avg DESC, name LIMIT ? OFFSET ?", (limit, offset)
+        ).fetchall())
+
+    def count(self):
+        return self._cached(("count",), lambda: self._conn().execute(f"SELECT COUNT(*) {RANKED}").fetchone()[0])
+
+    def rank(self, name):
+        # 1-based rank by average (ties share a rank), None if unranked
+        def compute():
+            row = self._conn().execute(f"SELECT avg {RANKED} AND name = ?", (name,)).fetchone()
+            if row is None:
+                return None
+            return 1 + self._conn().execute(f"SELECT COUNT(*) {RANKED} AND avg > ?", (row[0],)).fetchone()[0]
+        return self._cached(("rank", name), compute)
+
+    def get(self, name):
+        row = self._conn().execute(
+            "SELECT total_points, total_rounds FROM leaderboard WHERE name = ?", (name,)
+        ).fetchone()
+        return None if row is None else {"total_points": row[0], "total_rounds": row[1]}
+
+    def daily_top(self, day, difficulty, n=5):
+        # [(name, points)] of one daily challenge, best first (off daily_rank)
+        return self._cached(("daily", day, difficulty, n), lambda: self._conn().execute(
+            "SELECT name, points FROM daily_scores WHERE day = ? AND difficulty = ? "
+            "ORDER BY points DESC, name LIMIT ?", (day, difficulty, n)
+        ).fetchall())
@@ -0,0 +1,256 @@
+# Map screen of the game: imported lazily by project.py once a game starts,
+# so the setup screen and leaderboard render without the geo stack.
+
+import json
+import os
+import streamlit as st
+import folium
+from folium.plugins import VectorGridProtobuf
+from streamlit_folium import st_folium
+from geo import load_locator
+from distance import geodesic_km
+from eval_server import EvalService, evaluate_local
+import metrics
+
+# ==================== Prepare Geo Data ====================
+@st.cache_resource
+def load_world_geodata():
+    # Precomputed artifact (python geo.py build), spatial index built once per process
+    with metrics.timer("load_world_geodata"):
+        return load_locator()
+
+locator = load_world_geodata()
+
+@st.cache_resource
+def load_evaluator():
+    # CG_EVAL_WORKERS=N evaluates guesses in N worker processes shared by
+    # all sessions; default is inline on the script thread
+    return EvalService(workers=int(os.environ.get("CG_EVAL_WORKERS", "0")), locator=locator)
+
+def load_tile_url():
+    # Country outlines as vector tiles (tiles.py) from CG_TILE_URL, an
+    # endpoint the browser can reach (e.g. `python tiles.py serve` behind
+    # a proxy). Unset: the simplified GeoJSON outline goes inline with the
+    # map, since a server on this machine's localhost is out of reach for
+    # remote browsers (and only Streamlit's port is forwarded)
+    return os.environ.get("CG_TILE_URL")
+
+def evaluate_clicks(name, lats, lons, mode):
+    # [(inside, km)] per click from the evaluator; if its workers don't
+    # answer (crashed or stuck pool), inline instead of failing the page
+    try:
+        return load_evaluator().evaluate_many(name, lats, lons, mode=mode)
+    except TimeoutError:
+        return evaluate_local(locator, name, lats, lons, mode)
+
+OUTLINE_ZOOM = 2  # outline detail before the map reports a zoom (it starts at 1.7)
+
+def get_centroid_coords(country_name):
+    return locator.centroid(country_name)
+
+# ==================== Interactive Map ====================
+@metrics.timed("make_base_map")
+def make_base_map(tileset):
+    # Identical on every rerun of a round, so the frontend keeps the mounted
+    # Leaflet map (st_folium mutates it, so it is not shared via a cache)
+    m = folium.Map(
+        location=[20, 0],
+        zoom_start=1.7,
+        min_zoom=1,
+        max_zoom=5,
+        max_bounds=True,
+        tiles=tileset,
+        no_wrap=True
+    )
+    # With a tile endpoint, VectorGrid is loaded with the base map, the
+    # reveal layer only joins the overlay group at the end of a round
+    if load_tile_url():
+        for name, url in VectorGridProtobuf.default_js:
+            m.get_root().header.add_child(folium.JavascriptLink(url), name=name)
+    return m
+
+def reveal_layer(tile_url, country, game):
+    # Styles tile features by ADM0 code: solution green, neighbours orange,
+    # countries hit by wrong guesses red, everything else hidden
+    row = locator.row(country['name']['common'])
+    target = locator.codes[row] if row is not None else None
+    guessed = []
+    if game.guesses:
+        lats, lons = zip(*game.guesses)
+        guessed = sorted({locator.codes[r] for r in locator.locate_many(lats, lons) if r >= 0} - {target})
+    styles = {c: {'color': 'red', 'weight': 1, 'fill': True, 'fillOpacity': 0.2} for c in guessed}
+    for c in country.get('borders') or []:
+        styles[c] = {'color': 'orange', 'weight': 1, 'fill': True, 'fillOpacity': 0.1}
+    if target:
+        styles[target] = {'color': 'green', 'weight': 2, 'fill': True, 'fillOpacity': 0.15}
+    options = """{
+        maxNativeZoom: 5,
+        interactive: false,
+        vectorTileLayerStyles: {
+            countries: function(p) {
+                var s = %s[p.code];
+                return s || {stroke: false, fill: false};
+            }
+        }
+    }""" % json.dumps(styles)
+    return VectorGridProtobuf(tile_url, "Countries", options)
+
+@metrics.timed("display_interactive_map")
+def display_interactive_map(country, game, outline=None):
+    # outline: precomputed GeoJSON of the solution (daily challenge).
+    # UI-only state; guesses and help usage live in the game engine
+    if st.session_state.get('map_round') != game.round_number:
+        st.session_state.map_round = game.round_number
+        st.session_state.last_click_processed = None
+        st.session_state.show_help_circle = False
+        st.session_state.help_button_clicked = False
+
+    # -------------------------
+    # Show HELP button after first guess
+    # -------------------------
+    if len(game.guesses) >= 1 and not game.round_over and not st.session_state.help_button_clicked:
+        st.markdown("""
+            <style>
+            div.stButton > button {
+                width: 100%;
+                max-width: 700px;
+                background-color: #28a745;
+                color: white;
+                padding: 12px 20px;
+                font-size: 18px;
+                border: none;
+                border-radius: 10px;
+                transition: background-color 0.3s ease, transform 0.2s ease;
+                display: block;
+            }
+            div.stButton > button:hover {
+                background-color: #218838;
+                transform: scale(1.05);
+            }
+            </style>
+        """, unsafe_allow_html=True)
+
+        if st.button("🎯 Show Help Circle (-1 Point)"):
+            st.session_state.show_help_circle = True
+            st.session_state.help_button_clicked = True
+            game.use_help()
+
+    # -------------------------
+    # Set map tiles
+    # -------------------------
+    if st.session_state.get("show_labels") == "No":
+        tileset = "CartoDB PositronNoLabels"
+    else:
+        tileset = "CartoDB Positron"
+
+    m = make_base_map(tileset)
+
+    fg = folium.FeatureGroup(name="Guesses")
+
+    # -------------------------
+    # Draw previous guesses
+    # -------------------------
+    for i, (lat_i, lon_i) in enumerate(game.guesses):
+        popup = f"Attempt {i+1}"
+        folium.Marker(
+            location=[lat_i, lon_i],
+            popup=popup,
+            icon=folium.Icon(color='red', icon='question', prefix='fa')
+        ).add_to(fg)
+
+    # -------------------------
+    # Show correct country if round is over
+    # -------------------------
+    # One widget per round: the base map stays mounted in the browser and
+    # only the overlay feature group is sent on each rerun.
+    map_key = f'guess_map_{game.round_number}_{tileset}'
+
+    if game.round_over:
+        tile_url = load_tile_url()
+        # Outline, neighbours and guessed countries from the vector tiles;
+        # without a tile endpoint, a simplified GeoJSON outline of the
+        # solution with detail for the map's current zoom (st_folium reports
+        # it once the round is over). `outline` is one for OUTLINE_ZOOM.
+        zoom = (st.session_state.get(map_key) or {}).get('zoom') or OUTLINE_ZOOM
+        if not tile_url and (not outline or zoom != OUTLINE_ZOOM):
+            outline = locator.outline_geojson(country['name']['common'], zoom=zoom)
+        if tile_url:
+            reveal_layer(tile_url, country, game).add_to(fg)
+        elif outline:
+            folium.GeoJson(
+                outline,
+                style_function=lambda _: {'color': 'green', 'weight': 2, 'fillOpacity': 0.15},
+                interactive=False
+            ).add_to(fg)
+        coords = get_centroid_coords(country['name']['common'])
+        if coords:
+            folium.CircleMarker(
+                location=coords,
+                radius=8,
+                popup=f"Solution: {country['name']['common']}",
+                color='green',
+                fill=True,
+                fill_opacity=0.7
+            ).add_to(fg)
+
+    # -------------------------
+    # Draw Help Circle if requested
+    # -------------------------
+    if st.session_state.show_help_circle and game.guesses:
+        last_guess = game.guesses[-1]
+        correct = get_centroid_coords(country['name']['common'])
+        if correct:
+            if game.scoring == "edge":
+                # circle reaching the nearest border of the target
+                dist = evaluate_clicks(country['name']['common'], [last_guess[0]], [last_guess[1]], "edge")[0][1]
+            else:
+                dist = float(geodesic_km(last_guess[0], last_guess[1], *correct))
+            folium.Circle(
+                location=last_guess,
+                radius=dist * 1000,  # km → meters
+                color='blue',
+                fill=True,
+                fill_opacity=0,
+                weight=2,
+                interactive=False
+            ).add_to(fg)
+
+    # -------------------------
+    # Render map
+    # -------------------------
+    # Zoom changes only rerun the script once there is an outline to redraw
+    with metrics.timer("st_folium"):
+        map_data = st_folium(m, height=500, width=700, key=map_key, feature_group_to_add=fg,
+                             returned_objects=['last_clicked', 'zoom'] if game.round_over else ['last_clicked'])
+
+    # -------------------------
+    # Handle new guesses
+    # -------------------------
+    if map_data and map_data.get('last_clicked') and not game.round_over:
+        lat = map_data['last_clicked']['lat']
+        lon = map_data['last_clicked']['lng']
+        click_data = (lat, lon)
+        if click_data != st.session_state.last_click_processed:
+            st.session_state.last_click_processed = click_data
+            st.session_state.show_help_circle = False
+            st.session_state.help_button_clicked = False
+            with metrics.timer("evaluate_click"):
+                inside, dist = evaluate_clicks(country['name']['common'], [lat], [lon], game.scoring)[0]
+            game.score_click(lat, lon, inside, dist)
+            metrics.end_run()  # st.rerun() ends the run by raising
+            st.rerun()
+
+
+def display_previous_attempts(game):
+    country = game.country
+    st.markdown("### Your previous attempts:")
+    correct = get_centroid_coords(country['name']['common'])
+    if correct:
+        lats, lons = zip(*game.guesses)
+        with metrics.timer("evaluate_attempts"):
+            results = evaluate_clicks(country['name']['common'], lats, lons, game.scoring)
+        for i, (inside, dist) in enumerate(results):
+            if inside:
+                st.write(f"Attempt {i+1}: 🎯 Correct Hit!")
+            else:
+                st.write(f"Attempt {i+1}: {int(dist)} km away")
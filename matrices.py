@@ -0,0 +1,127 @@
+# ==================== Country Matrices ====================
+# Pairwise country distances and the land-border graph, precomputed from the
+# world geometry and stored as plain .npy files under data/matrix/, so they
+# are memory-mapped instead of loaded (every process shares the same pages).
+#
+#   python matrices.py build
+#
+# Rows are the locator rows (geo.CountryLocator), so a hit test result can
+# index the matrices directly:
+#   centroid_km[i, j]  geodesic km between the centroids of i and j
+#   edge_km[i, j]      geodesic km between the closest borders (0 = touching)
+#   indptr/indices     CSR adjacency: rows sharing a land border
+
+import json
+import os
+import sys
+
+import numpy as np
+import shapely
+
+from distance import geodesic_km, pairwise_km
+
+MATRIX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "matrix")
+MATRIX_VERSION = 1
+ARRAYS = ("centroid_km", "edge_km", "indptr", "indices")
+
+
+class CountryMatrix:
+    def __init__(self, names, codes, centroid_km, edge_km, indptr, indices):
+        self.names = list(names)
+        self.codes = list(codes)
+        self.centroid_km = centroid_km
+        self.edge_km = edge_km
+        self.indptr = indptr
+        self.indices = indices
+        self.index = {n.lower(): i for i, n in enumerate(self.names)}
+        self.code_index = {c: i for i, c in enumerate(self.codes) if c}
+
+    def row(self, name):
+        return self.index.get(name.lower())
+
+    def distance(self, a, b, kind="centroid"):
+        # km between rows a and b; kind is "centroid" or "edge"
+        table = self.edge_km if kind == "edge" else self.centroid_km
+        return float(table[a, b])
+
+    def neighbours(self, i):
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def neighbour_names(self, name):
+        i = self.row(name)
+        return [] if i is None else [self.names[j] for j in self.neighbours(i)]
+
+    def click_km(self, locator, lat, lon, target, kind="edge"):
+        # km from the country containing the click to the target row,
+        # None for clicks at sea (the locator and matrix must share rows)
+        hit = locator.locate_many([lat], [lon])[0]
+        return None if hit < 0 else self.distance(int(hit), target, kind)
+
+
+# ==================== Build ====================
+def _edge_km(geometries):
+    # Nearest points of each pair on the lon/lat polygons, measured on the
+    # ellipsoid. Planar nearest points are close to, not exactly, the
+    # geodesic ones; pairs across the antimeridian are not wrapped.
+    n = len(geometries)
+    out = np.zeros((n, n), dtype=np.float32)
+    i, j = np.triu_indices(n, 1)
+    apart = shapely.distance(geometries[i], geometries[j]) > 0
+    i, j = i[apart], j[apart]
+    lines = shapely.shortest_line(geometries[i], geometries[j])
+    ends = shapely.get_coordinates(lines).reshape(-1, 2, 2)  # (pair, end, lon/lat)
+    km = geodesic_km(ends[:, 0, 1], ends[:, 0, 0], ends[:, 1, 1], ends[:, 1, 0])
+    out[i, j] = out[j, i] = km
+    return out
+
+
+def build_matrix(locator, out=MATRIX_DIR):
+    lats, lons = locator.centroids[:, 0], locator.centroids[:, 1]
+    arrays = {"centroid_km": pairwise_km(lats, lons, lats, lons).astype(np.float32)}
+    arrays["edge_km"] = _edge_km(locator.geometries)
+
+    touching = arrays["edge_km"] == 0
+    np.fill_diagonal(touching, False)
+    arrays["indptr"] = np.concatenate([[0], np.cumsum(touching.sum(axis=1))]).astype(np.int32)
+    arrays["indices"] = np.nonzero(touching)[1].astype(np.int32)
+
+    os.makedirs(out, exist_ok=True)
+    for key in ARRAYS:
+        tmp = os.path.join(out, f"{key}.tmp.npy")
+        np.save(tmp, arrays[key])
+        os.replace(tmp, os.path.join(out, f"{key}.npy"))
+    meta = {"version": MATRIX_VERSION, "names": locator.names, "codes": locator.codes}
+    tmp = os.path.join(out, "meta.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(out, "meta.json"))
+    return out
+
+
+def load_matrix(path=MATRIX_DIR, locator=None):
+    # Memory-maps the artifact; rebuilds it first (from `locator`) if it is
+    # missing, outdated or was built for different locator rows
+    try:
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        fresh = meta["version"] == MATRIX_VERSION and (locator is None or meta["names"] == locator.names)
+    except (OSError, ValueError, KeyError):
+        fresh = False
+    if fresh:
+        arrays = [np.load(os.path.join(path, f"{key}.npy"), mmap_mode="r") for key in ARRAYS]
+        return CountryMatrix(meta["names"], meta["codes"], *arrays)
+    if locator is None:
+        import geo
+
+        locator = geo.load_locator()
+    build_matrix(locator, path)
+    return load_matrix(path, locator)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["build"]:
+        import geo
+
+        print(f"Wrote {build_matrix(geo.load_locator())}")
+    else:
+        print("usage: python matrices.py build")
@@ -0,0 +1,166 @@
+# ==================== Metrics ====================
+# In-process timing of the app's hot sections: every timed call lands in a
+# fixed-bucket histogram per section and in a ring buffer of recent events
+# (tagged with the script run they belong to, for per-rerun breakdowns).
+# Read back on the hidden admin page (project.py, ?admin=<CG_ADMIN_TOKEN>),
+# or scraped as Prometheus text from serve_metrics() (CG_METRICS_PORT, bound
+# to localhost unless CG_METRICS_HOST says otherwise).
+#
+#   with metrics.timer("st_folium"):
+#       ...
+#   @metrics.timed("display_interactive_map")
+#   def display_interactive_map(...): ...
+
+import functools
+import itertools
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds in seconds (Prometheus "le"), +Inf implied
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+RING_SIZE = 4096
+METRIC_NAME = "country_guesser_section_seconds"
+
+
+class Metrics:
+    def __init__(self, ring_size=RING_SIZE, buckets=BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._hist = {}  # section -> [bucket counts..., +Inf count, sum]
+        self._ring = deque(maxlen=ring_size)  # (wall time, run id, section, seconds)
+        self._runs = itertools.count(1)
+        self._local = threading.local()  # current script run of this thread
+
+    # ---------- recording ----------
+    def observe(self, section, seconds):
+        k = 0
+        while k < len(self.buckets) and seconds > self.buckets[k]:
+            k += 1
+        run = getattr(self._local, "run", None)
+        with self._lock:
+            h = self._hist.get(section)
+            if h is None:
+                h = self._hist[section] = [0] * (len(self.buckets) + 2)
+            h[k] += 1
+            h[-1] += seconds
+            self._ring.append((time.time(), run, section, seconds))
+
+    @contextmanager
+    def timer(self, section):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(section, time.perf_counter() - t0)
+
+    def timed(self, section):
+        def wrap(fn):
+            @functools.wraps(fn)
+            def inner(*args, **kwargs):
+                with self.timer(section):
+                    return fn(*args, **kwargs)
+            return inner
+        return wrap
+
+    def begin_run(self):
+        # Streamlit runs a session's script on one thread at a time
+        self._local.run = next(self._runs)
+        self._local.started = time.perf_counter()
+
+    def end_run(self):
+        # Call before st.rerun()/st.stop() too, they end the run by raising
+        started = getattr(self._local, "started", None)
+        if started is not None:
+            self.observe("rerun", time.perf_counter() - started)
+            self._local.started = None
+
+    # ---------- reading ----------
+    def histograms(self):
+        # section -> {"count", "sum", "buckets": [(le, cumulative count), ...]}
+        with self._lock:
+            hist = {k: list(v) for k, v in self._hist.items()}
+        out = {}
+        for section, h in sorted(hist.items()):
+            cumulative = list(itertools.accumulate(h[:-1]))
+            out[section] = {
+                "count": cumulative[-1],
+                "sum": h[-1],
+                "buckets": list(zip([*self.buckets, "+Inf"], cumulative)),
+            }
+        return out
+
+    def recent(self, n=None):
+        with self._lock:
+            events = list(self._ring)
+        return events if n is None else events[-n:]
+
+    def runs(self, n=50):
+        # Per-rerun breakdown of the last n runs: [(run id, {section: seconds})]
+        by_run = {}
+        for _, run, section, seconds in self.recent():
+            if run is not None:
+                sections = by_run.setdefault(run, {})
+                sections[section] = sections.get(section, 0.0) + seconds
+        return sorted(by_run.items())[-n:]
+
+    def reset(self):
+        with self._lock:
+            self._hist.clear()
+            self._ring.clear()
+
+    # ---------- export ----------
+    def to_json(self):
+        return json.dumps({
+            "histograms": self.histograms(),
+            "recent": [{"time": t, "run": r, "section": s, "seconds": d} for t, r, s, d in self.recent()],
+        })
+
+    def to_prometheus(self):
+        lines = [f"# HELP {METRIC_NAME} Time spent per app section.", f"# TYPE {METRIC_NAME} histogram"]
+        for section, h in self.histograms().items():
+            label = section.replace("\\", "\\\\").replace('"', '\\"')
+            for le, count in h["buckets"]:
+                lines.append(f'{METRIC_NAME}_bucket{{section="{label}",le="{le}"}} {count}')
+            lines.append(f'{METRIC_NAME}_sum{{section="{label}"}} {h["sum"]:.6f}')
+            lines.append(f'{METRIC_NAME}_count{{section="{label}"}} {h["count"]}')
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Metrics()
+timer = REGISTRY.timer
+timed = REGISTRY.timed
+begin_run = REGISTRY.begin_run
+end_run = REGISTRY.end_run
+
+
+def serve_metrics(registry=REGISTRY, host="127.0.0.1", port=9464):
+    # Daemon HTTP server: /metrics (Prometheus text) and /metrics.json.
+    # No auth, so local only unless a host is given on purpose
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            if path == "/metrics":
+                body, ctype = registry.to_prometheus(), "text/plain; version=0.0.4"
+            elif path == "/metrics.json":
+                body, ctype = registry.to_json(), "application/json"
+            else:
+                self.send_error(404)
+                return
+            data = body.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics-server").start()
+    return server
@@ -0,0 +1,139 @@
+# ==================== Country Name Index ====================
+# Typed guesses -> catalog countries. Every spelling the catalog knows
+# (common, official, altSpellings, translations) is normalized and indexed
+# once per snapshot (catalog.name_index()):
+#   - exact:  dict lookup
+#   - prefix: bisect over the sorted spellings, then over their later words
+#             (so "kor" finds "South Korea"), for autocomplete
+#   - typos:  trigram index (per spelling length) for candidates, then a
+#             bounded edit distance
+#
+#   index = NameIndex(countries)
+#   index.match("Ivory Cost")   -> [id of Côte d'Ivoire]
+#   index.complete("ger")       -> [(id, "Germany"), ...]
+
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import Counter
+from itertools import chain
+
+_SEPARATORS = re.compile(r"[\W_]+")  # anything but letters/digits of any script
+
+
+def normalize(text):
+    # "Côte d'Ivoire" -> "cote d ivoire": no accents, case, punctuation or "the"
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    text = _SEPARATORS.sub(" ", text).strip()
+    return text[4:] if text.startswith("the ") else text
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[k:k + 3] for k in range(len(padded) - 2)}
+
+
+def max_typos(text):
+    # edits tolerated for a query of this length
+    return 0 if len(text) < 4 else 1 if len(text) < 8 else 2
+
+
+def edit_distance(a, b, limit):
+    # Levenshtein distance, or limit + 1 as soon as it must exceed limit;
+    # only the diagonal band |i - j| <= limit is computed
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    over = limit + 1
+    prev = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i, ca in enumerate(a, 1):
+        lo, hi = max(1, i - limit), min(len(b), i + limit)
+        cur = [i if i <= limit else over] + [over] * len(b)
+        for j in range(lo, hi + 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != b[j - 1]))
+        if min(cur[lo - 1:hi + 1]) > limit:
+            return over
+        prev = cur
+    return min(prev[-1], over)
+
+
+class NameIndex:
+    def __init__(self, countries):
+        # countries: catalog list; ids are positions in it
+        self.display = [c["name"]["common"] for c in countries]
+        self.exact = {}  # spelling -> ids
+        for i, c in enumerate(countries):
+            for name in self._spellings(c):
+                key = normalize(name)
+                if key:
+                    self.exact.setdefault(key, set()).add(i)
+        self.keys = list(self.exact)
+        self.grams = {}  # (spelling length, trigram) -> key numbers
+        for k, key in enumerate(self.keys):
+            for g in _trigrams(key):
+                self.grams.setdefault((len(key), g), []).append(k)
+        # prefix tables of (text, id), sorted: whole spellings, and the rest
+        # of each spelling from its second word on
+        self.prefixes = sorted((key, i) for key, ids in self.exact.items() for i in ids)
+        self.word_prefixes = sorted({(key[m.end():], i) for key, ids in self.exact.items()
+                                     for m in re.finditer(" ", key) for i in ids})
+
+    @staticmethod
+    def _spellings(country):
+        name = country.get("name", {})
+        yield name.get("common", "")
+        yield name.get("official", "")
+        yield from country.get("altSpellings") or []
+        for t in (country.get("translations") or {}).values():
+            yield t.get("common", "")
+            yield t.get("official", "")
+
+    def lookup(self, text):
+        # ids whose spelling matches exactly (after normalization)
+        return sorted(self.exact.get(normalize(text), ()))
+
+    def match(self, text, limit=None):
+        # ids of the closest spelling within `limit` edits (default by
+        # length); several ids only if they tie. [] if nothing is close.
+        key = normalize(text)
+        if key in self.exact:
+            return sorted(self.exact[key])
+        limit = max_typos(key) if limit is None else limit
+        if limit == 0:
+            return []
+        # a spelling within `limit` edits is at most `limit` longer or
+        # shorter and shares all but 3 * limit trigrams
+        grams = _trigrams(key)
+        need = len(grams) - 3 * limit
+        lengths = range(len(key) - limit, len(key) + limit + 1)
+        counts = Counter(chain.from_iterable(self.grams.get((n, g), ()) for n in lengths for g in grams))
+        # most shared trigrams first; each hit raises the bar for the rest
+        best, found = limit + 1, set()
+        for n, k in sorted(((n, k) for k, n in counts.items() if n >= need), reverse=True):
+            if n < len(grams) - 3 * min(best, limit):
+                break
+            d = edit_distance(key, self.keys[k], min(best, limit))
+            if d < best:
+                best, found = d, set(self.exact[self.keys[k]])
+            elif d == best <= limit:
+                found |= self.exact[self.keys[k]]
+        return sorted(found)
+
+    def complete(self, prefix, limit=10):
+        # [(id, common name)] of countries with a spelling starting with
+        # `prefix`, then those with a later word starting with it; each once
+        key = normalize(prefix)
+        if not key:
+            return []
+        out, seen = [], set()
+        for table in (self.prefixes, self.word_prefixes):
+            for k in range(bisect_left(table, (key,)), len(table)):
+                spelling, i = table[k]
+                if not spelling.startswith(key):
+                    break
+                if i not in seen:
+                    seen.add(i)
+                    out.append((i, self.display[i]))
+                    if len(out) == limit:
+                        return out
+        return out
@@ -1,23 +1,53 @@
 # Elias Stand 09.05. 18:00
 
-import streamlit as st
-import random
-import requests
-import matplotlib.pyplot as plt
-import pandas as pd
-import json
+import base64
+import hmac
+import logging
 import os
-import io
-from PIL import Image
-import geopandas as gpd
-from shapely.geometry import Point
-import folium
-from streamlit_folium import st_folium
-from geopy.distance import geodesic
+import secrets
+import streamlit as st
+import catalog
+import daily
+import events
+import metrics
+import refresh
+import sessions
+from leaderboard import LeaderboardStore
+from flags import FlagCache
+from engine import Game
+from difficulty import difficulty_lists
+
+metrics.begin_run()
 
 # Set Page Configuration
 st.set_page_config(page_title="Country Guesser", layout="wide")
 
+# Hidden timing dashboard: ?admin=<CG_ADMIN_TOKEN> (disabled without a token)
+_admin_token = os.environ.get("CG_ADMIN_TOKEN")
+if _admin_token and hmac.compare_digest(st.query_params.get("admin", "").encode(), _admin_token.encode()):
+    from admin import display_admin
+
+    display_admin()
+    st.stop()
+
+@st.cache_resource
+def start_metrics_endpoint():
+    # Prometheus scrape target on CG_METRICS_PORT, if set; localhost only
+    # unless CG_METRICS_HOST (e.g. 0.0.0.0) exposes it
+    port = os.environ.get("CG_METRICS_PORT")
+    host = os.environ.get("CG_METRICS_HOST", "127.0.0.1")
+    if not port:
+        return None
+    try:
+        return metrics.serve_metrics(host=host, port=int(port))
+    except OSError as e:
+        # Port taken (e.g. a second replica on this host): play on without
+        # it; None is cached, so this isn't retried on every rerun
+        logging.getLogger(__name__).warning("metrics endpoint %s:%s not started: %s", host, port, e)
+        return None
+
+start_metrics_endpoint()
+
 # --- Make layout tighter ---
 st.markdown("""
     <style>
@@ -42,105 +72,37 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# Define difficulty lists manually
-difficulty_lists = {
-    "Easy": [
-        "United States", "United Kingdom", "Germany", "France", "Italy", "Spain", "Canada", "Australia",
-        "China", "Japan", "Brazil", "Russia", "Netherlands", "Austria", "Switzerland", "Portugal", "Belgium",
-        "Sweden", "Norway", "Denmark", "Ireland", "Poland", "Greece", "Turkey", "Egypt", "South Africa",
-        "India", "Mexico", "Argentina", "South Korea"
-    ],
-    "Medium": [
-        "Thailand", "Morocco", "Ukraine", "Israel", "Tunisia", "United Arab Emirates", "Czech Republic",
-        "Romania", "Serbia", "Croatia", "Hungary", "Finland", "Slovakia", "Bulgaria", "Algeria", "Vietnam",
-        "Indonesia", "Malaysia", "Pakistan", "Nigeria", "Colombia", "Chile", "Peru", "Iran", "Kazakhstan",
-        "Philippines", "Cuba", "Jordan", "Lebanon", "Venezuela"
-    ],
-    "Hard": [
-        "Uzbekistan", "Myanmar", "Bangladesh", "Nepal", "Laos", "Cambodia", "Mongolia", "Sri Lanka",
-        "Ethiopia", "Kenya", "Ghana", "Zambia", "Angola", "Mozambique", "Sudan", "Yemen", "Syria", "Afghanistan",
-        "Mali", "Burkina Faso", "Chad", "Niger", "Rwanda", "Uganda", "Tanzania", "Democratic Republic of the Congo",
-        "Bolivia", "Guatemala", "Honduras", "North Korea", "Albania", "Armenia", "Azerbaijan", "Bahrain",
-        "Belarus", "Benin", "Bhutan", "Bosnia and Herzegovina", "Botswana", "Burundi", "Central African Republic",
-        "Comoros", "Congo", "Costa Rica", "Côte d'Ivoire", "Cyprus", "Djibouti", "Dominican Republic", "Ecuador",
-        "El Salvador", "Eritrea", "Estonia", "Eswatini", "Fiji", "Gabon", "Gambia", "Georgia", "Guinea",
-        "Guinea-Bissau", "Guyana", "Haiti", "Iceland", "Iraq", "Jamaica", "Kyrgyzstan", "Latvia", "Lesotho",
-        "Liberia", "Libya", "Lithuania", "Madagascar", "Malawi", "Maldives", "Mauritania", "Mauritius", "Moldova",
-        "Namibia", "Nicaragua", "North Macedonia", "Oman", "Panama", "Papua New Guinea", "Paraguay", "Qatar",
-        "Sierra Leone", "Singapore", "Slovenia", "Somalia", "Suriname", "Timor-Leste", "Togo",
-        "Trinidad and Tobago", "Turkmenistan", "Uruguay", "Zimbabwe", "Cabo Verde", "Luxembourg", "Brunei",
-        "Montenegro", "Equatorial Guinea", "Sao Tome and Principe", "Seychelles", "Solomon Islands", "Vanuatu",
-        "Saint Lucia", "Saint Vincent and the Grenadines", "Samoa", "Kiribati", "Barbados", "Belize", "Bahamas",
-        "Saint Kitts and Nevis", "Micronesia", "Palau", "Tonga", "Marshall Islands", "Antigua and Barbuda", "Dominica"
-    ]
-}
-difficulty_lists["All Countries"] = difficulty_lists["Easy"] + difficulty_lists["Medium"] + difficulty_lists["Hard"]
-
-# ==================== Prepare Geo Data ====================
-@st.cache_data
-def load_world_geodata():
-    shapefile_path = "data/ne_110m_admin_0_countries/ne_110m_admin_0_countries.shp"
-    gdf = gpd.read_file(shapefile_path)
-    if gdf.crs and gdf.crs.to_epsg() != 4326:
-        gdf = gdf.to_crs(epsg=4326)
-    gdf['name_lower'] = gdf['NAME'].str.lower()
-    gdf_proj = gdf.to_crs(epsg=3857)
-    gdf['centroid'] = gdf_proj.geometry.centroid.to_crs(epsg=4326)
-    return gdf[['NAME', 'name_lower', 'geometry', 'centroid']]
-
-world_gdf = load_world_geodata()
-
-def get_centroid_coords(country_name):
-    row = world_gdf[world_gdf['name_lower'] == country_name.lower()]
-    if not row.empty:
-        pt = row.iloc[0]['centroid']
-        return [pt.y, pt.x]
-    return None
 
 # ==================== Fetch Countries By Population ====================
-@st.cache_data
-def fetch_countries_by_population(difficulty):
-    url = "https://restcountries.com/v3.1/all"
-    r = requests.get(url, timeout=10)
-    data = r.json() if r.status_code == 200 else []
-
-    # Match by name using the manual difficulty list
-    name_to_country = {c["name"]["common"]: c for c in data if "name" in c and "common" in c["name"]}
+@metrics.timed("fetch_country_ids")
+def fetch_country_ids(difficulty):
+    # Indices into the shared catalog snapshot (see catalog.py): no network
+    # on game start, and sessions hold ids instead of country dicts
+    name_to_id = catalog.ids_by_name()
     target_names = difficulty_lists.get(difficulty, [])
-    return [name_to_country[name] for name in target_names if name in name_to_country]
+    return [name_to_id[name] for name in target_names if name in name_to_id]
 
 
 # ==================== Leaderboard ====================
-def load_leaderboard():
-    if os.path.exists("leaderboard.json"):
-        return json.load(open("leaderboard.json", "r"))
-    return {}
-
-def save_leaderboard(lb):
-    json.dump(lb, open("leaderboard.json", "w"), indent=2)
+@st.cache_resource
+def load_leaderboard_store():
+    return LeaderboardStore()
 
 def update_leaderboard_accuracy(players):
-    lb = load_leaderboard()
-    for p in players:
-        name = p.name
-        if name not in lb:
-            lb[name] = {"total_points": 0, "total_rounds": 0}
-        lb[name]["total_points"] += p.score
-        lb[name]["total_rounds"] += p.rounds_played
-    save_leaderboard(lb)
+    # One atomic transaction, increments are applied in SQL
+    with metrics.timer("leaderboard_write"):
+        load_leaderboard_store().add_results((p.name, p.score, p.rounds_played) for p in players)
 
 def display_leaderboard_top5():
-    lb = load_leaderboard()
-    if not lb:
+    with metrics.timer("leaderboard_read"):
+        scores = load_leaderboard_store().top(5)
+    if not scores:
         st.write("No leaderboard data yet.")
         return
 
     # Leaderboard title
     st.markdown("## 🏆 Leaderboard - All Countries Mode")
 
-    scores = [(n, d["total_points"]/d["total_rounds"]) for n, d in lb.items() if d["total_rounds"] > 0]
-    scores = sorted(scores, key=lambda x: x[1], reverse=True)[:5]
-
     # Small nice background container
     with st.container():
         for i, (n, avg) in enumerate(scores, 1):
@@ -159,269 +121,128 @@ def display_leaderboard_top5():
             </div>
             """, unsafe_allow_html=True)
 
-
-# ==================== Interactive Map ====================
-def display_interactive_map(country, game):
-    if 'guesses' not in st.session_state:
-        st.session_state.guesses = []
-    if 'current_country' not in st.session_state or st.session_state.current_country != country['name']['common']:
-        st.session_state.guesses = []
-        st.session_state.current_country = country['name']['common']
-    if 'last_click_processed' not in st.session_state:
-        st.session_state.last_click_processed = None
-    if 'show_help_circle' not in st.session_state:
-        st.session_state.show_help_circle = False
-    if 'help_button_clicked' not in st.session_state:
-        st.session_state.help_button_clicked = False
-    if 'help_used_this_round' not in st.session_state:
-        st.session_state.help_used_this_round = 0
-
-    # -------------------------
-    # Show HELP button after first guess
-    # -------------------------
-    if len(st.session_state.guesses) >= 1 and not game.round_over and not st.session_state.help_button_clicked:
-        st.markdown("""
-            <style>
-            div.stButton > button {
-                width: 100%;
-                max-width: 700px;
-                background-color: #28a745;
-                color: white;
-                padding: 12px 20px;
-                font-size: 18px;
-                border: none;
-                border-radius: 10px;
-                transition: background-color 0.3s ease, transform 0.2s ease;
-                display: block;
-            }
-            div.stButton > button:hover {
-                background-color: #218838;
-                transform: scale(1.05);
-            }
-            </style>
-        """, unsafe_allow_html=True)
-
-        if st.button("🎯 Show Help Circle (-1 Point)"):
-            st.session_state.show_help_circle = True
-            st.session_state.help_button_clicked = True
-            st.session_state.help_used_this_round += 1
-
-    # -------------------------
-    # Set map tiles
-    # -------------------------
-    if st.session_state.get("show_labels") == "No":
-        tileset = "CartoDB PositronNoLabels"
-    else:
-        tileset = "CartoDB Positron"
-
-    m = folium.Map(
-        location=[20, 0],
-        zoom_start=1.7,
-        min_zoom=1,
-        max_zoom=5,
-        max_bounds=True,
-        tiles=tileset,
-        no_wrap=True
-    )
-
-    fg = folium.FeatureGroup(name="Guesses")
-
-    # -------------------------
-    # Draw previous guesses
-    # -------------------------
-    for i, (lat_i, lon_i) in enumerate(st.session_state.guesses):
-        popup = f"Attempt {i+1}"
-        folium.Marker(
-            location=[lat_i, lon_i],
-            popup=popup,
-            icon=folium.Icon(color='red', icon='question', prefix='fa')
-        ).add_to(fg)
-
-    # -------------------------
-    # Show correct country if round is over
-    # -------------------------
-    if game.round_over:
-        coords = get_centroid_coords(country['name']['common'])
-        if coords:
-            folium.CircleMarker(
-                location=coords,
-                radius=8,
-                popup=f"Solution: {country['name']['common']}",
-                color='green',
-                fill=True,
-                fill_opacity=0.7
-            ).add_to(fg)
-
-    # -------------------------
-    # Draw Help Circle if requested
-    # -------------------------
-    if st.session_state.show_help_circle and st.session_state.guesses:
-        last_guess = st.session_state.guesses[-1]
-        correct = get_centroid_coords(country['name']['common'])
-        if correct:
-            dist = geodesic((last_guess[0], last_guess[1]), tuple(correct)).kilometers
-            folium.Circle(
-                location=last_guess,
-                radius=dist * 1000,  # km → meters
-                color='blue',
-                fill=True,
-                fill_opacity=0,
-                weight=2,
-                interactive=False
-            ).add_to(fg)
-
-    fg.add_to(m)
-
-    # -------------------------
-    # Render map
-    # -------------------------
-    map_key = f'gdp_map_{game.current_player_index}_{len(st.session_state.guesses)}'
-    map_data = st_folium(m, height=500, width=700, key=map_key, returned_objects=['last_clicked'])
-
-    # -------------------------
-    # Handle new guesses
-    # -------------------------
-    if map_data and map_data.get('last_clicked') and not game.round_over:
-        lat = map_data['last_clicked']['lat']
-        lon = map_data['last_clicked']['lng']
-        click_data = (lat, lon)
-        if click_data != st.session_state.last_click_processed:
-            st.session_state.last_click_processed = click_data
-            st.session_state.guesses.append(click_data)
-
-            st.session_state.show_help_circle = False
-            st.session_state.help_button_clicked = False
-
-            guess_pt = Point(lon, lat)
-            row = world_gdf[world_gdf['name_lower'] == country['name']['common'].lower()]
-            if not row.empty and row.iloc[0]['geometry'].contains(guess_pt):
-                base_pts = max(5 - (game.hint_index - 1), 1)
-                pts = max(base_pts - st.session_state.help_used_this_round, 0)
-                game.get_current_player().add_score(pts)
-                game.message = f"🎉 Hit! +{pts} points."
-                game.round_over = True
-            else:
-                correct = get_centroid_coords(country['name']['common'])
-                if correct:
-                    dist = geodesic((lat, lon), tuple(correct)).kilometers
-                    if dist <= 250:
-                        pts = max(5 - (game.hint_index - 1), 1)
-                        pts = max(pts - st.session_state.help_used_this_round, 0)  # Deduct points for help usage
-                        game.get_current_player().add_score(pts)
-                        game.message = f"🎉 Close hit! Distance: {int(dist)} km → +{pts} points."
-                        game.round_over = True
-                    else:
-                        game.guess_count += 1
-                        if game.hint_index < 5:
-                            game.hint_index += 1
-                        game.message = f"❌ Wrong – {int(dist)} km away."
-                        if game.guess_count >= 5:
-                            game.get_current_player().add_score(0)
-                            game.message += f" Round over. Answer: {country['name']['common']}."
-                            game.round_over = True
-
-
-
-            st.rerun()
+def update_daily_leaderboard(players):
+    with metrics.timer("leaderboard_write"):
+        load_leaderboard_store().add_daily_results(
+            st.session_state.daily, st.session_state.difficulty,
+            ((p.name, p.score, p.rounds_played) for p in players))
+
+def display_daily_top5():
+    st.markdown(f"## 📅 Daily Challenge - {daily.today()}")
+    store = load_leaderboard_store()
+    for tab, difficulty in zip(st.tabs(list(difficulty_lists)), difficulty_lists):
+        with tab:
+            with metrics.timer("leaderboard_read"):
+                scores = store.daily_top(daily.today(), difficulty, 5)
+            if not scores:
+                st.write("Nobody has played this one yet.")
+            for i, (n, pts) in enumerate(scores, 1):
+                st.markdown(f"**{i}. {n}** — {pts} points")
 
 
 # ==================== Hints ====================
-def format_population(n):
-    return f"{n:,}" if isinstance(n, int) else "Unknown"
-
-def get_hint(country, i):
-    if i == 1:
-        return f"Population: {format_population(country.get('population', 0))}"
-    if i == 2:
-        area = country.get("area")
-        return f"Area: {int(area):,} km²" if area else "Area: Unknown"
-    if i == 3:
-        flag = country.get("flags", {})
-        return flag.get("png") or flag.get("svg") or ""
-    if i == 4:
-        caps = country.get("capital") or []
-        return "Capital: " + ", ".join(caps) if caps else "Capital: Unknown"
-    if i == 5:
-        borders = country.get("borders") or []
-        mapping = st.session_state.country_code_mapping
-        names = [mapping.get(c, c) for c in borders]
-        return "Borders: " + ", ".join(names) if names else "Borders: None"
-    return ""
-
-# ==================== Game Logic ====================
-class Player:
-    def __init__(self, name):
-        self.name = name
-        self.score = 0
-        self.rounds_played = 0
-
-    def add_score(self, pts):
-        self.score += pts
-        self.rounds_played += 1
-
-class Game:
-    def __init__(self, names, target, countries):
-        self.players = [Player(n) for n in names]
-        self.current_player_index = 0
-        self.target_score = target
-        self.countries = countries
-        self.used_countries = []
-        self.new_round()
-
-    def get_current_player(self):
-        return self.players[self.current_player_index]
-
-    def new_round(self):
-        avail = [c for c in self.countries if c not in self.used_countries]
-        if not avail:
-            self.used_countries = []
-            avail = self.countries.copy()
-        self.country = random.choice(avail)
-        self.used_countries.append(self.country)
-        self.hint_index = 1
-        self.guess_count = 0
-        self.round_over = False
-        self.message = ""
-
-        # Reset session state for round-specific help tracking
-        st.session_state.guesses = []
-        st.session_state.current_country = None
-        st.session_state.last_click_processed = None
-        st.session_state.show_help_circle = False
-        st.session_state.help_button_clicked = False
-        st.session_state.help_used_this_round = 0
-
-
-    def process_guess(self, guess):
-        corr = self.country["name"]["common"].lower().strip()
-        if guess.lower().strip() == corr:
-            pts = max(5 - (self.hint_index - 1), 1)
-            self.get_current_player().add_score(pts)
-            self.message = f"✅ Correct! +{pts} points."
-            self.round_over = True
-        else:
-            self.guess_count += 1
-            if self.hint_index < 5:
-                self.hint_index += 1
-            if self.hint_index > 5 or self.guess_count >= 5:
-                self.get_current_player().add_score(0)
-                self.message = f"❌ Wrong. Answer: {self.country['name']['common']}."
-                self.round_over = True
-            else:
-                self.message = "❌ Wrong, try again!"
+@st.cache_resource
+def load_flag_cache():
+    return FlagCache()
+
+# Catalog + flags are kept fresh in the background (see refresh.py)
+refresh.start_background_refresh(load_flag_cache())
+
+
+# ==================== Daily Challenge ====================
+@st.cache_resource(max_entries=2)
+def load_daily_challenge(day):
+    # One artifact per day for all sessions (see daily.py), built here only
+    # if `python daily.py build` didn't generate it ahead of time
+    with metrics.timer("daily_load"):
+        return daily.load_daily(day, flags=load_flag_cache(), download=False)
+
+def daily_round(game):
+    # Precomputed hints/outline of the current round in daily mode, else None
+    day = st.session_state.get("daily")
+    if not day:
+        return None
+    return daily.current_round(load_daily_challenge(day), st.session_state.difficulty, game)
+
+
+# ==================== Event Log ====================
+@st.cache_resource
+def load_event_log():
+    # Game events for analytics.py, written off the script thread (events.py)
+    return events.open_log()
+
+def game_events(sid):
+    # Event sink for the session's game, tagged with its id and settings
+    log = load_event_log()
+    if log is None:
+        return None
+    return log.sink(sid=sid, difficulty=st.session_state.get("difficulty"), daily=st.session_state.get("daily"))
+
+
+# ==================== Sessions ====================
+# Settings saved with the game, restored with it
+SESSION_UI_KEYS = ("difficulty", "show_labels", "leaderboard_saved", "daily")
+
+@st.cache_resource
+def load_session_store():
+    return sessions.open_store()
+
+def start_session(make_game):
+    # New game under a fresh id in the URL; a reload or reconnect finds it
+    # there. make_game(events) gets the id's event sink, so the first round
+    # is logged too. False if no game could be made.
+    sid = secrets.token_urlsafe(16)
+    game = make_game(game_events(sid))
+    if game is None:
+        return False
+    st.session_state.game = game
+    st.session_state.sid = sid
+    st.query_params["sid"] = sid
+    return True
+
+def resume_session():
+    # Lazy rehydrate: only when the URL names a game this process doesn't hold
+    sid = st.query_params.get("sid")
+    if "game" in st.session_state or not sid:
+        return
+    with metrics.timer("session_load"):
+        restored = sessions.load(load_session_store().get(sid), catalog.countries(), catalog.code_to_name())
+    if restored is None:
+        del st.query_params["sid"]
+        return
+    game, ui = restored
+    st.session_state.game = game
+    st.session_state.sid = sid
+    for k in SESSION_UI_KEYS:
+        if k in ui:
+            st.session_state[k] = ui[k]
+    game.events = game_events(sid)
+
+def save_session():
+    # After every move; skipped when nothing changed since the last write
+    game, sid = st.session_state.get("game"), st.session_state.get("sid")
+    if game is None or sid is None:
+        return
+    blob = sessions.dump(game, {k: st.session_state[k] for k in SESSION_UI_KEYS if k in st.session_state})
+    if blob != st.session_state.get("saved_state"):
+        with metrics.timer("session_save"):
+            load_session_store().put(sid, blob)
+        st.session_state.saved_state = blob
+
+def rerun():
+    metrics.end_run()  # st.rerun() ends the run by raising
+    st.rerun()
 
-    def next_player(self):
-        self.current_player_index = (self.current_player_index + 1) % len(self.players)
+def end_session():
+    sid = st.session_state.get("sid")
+    if sid:
+        load_session_store().delete(sid)
+    st.query_params.clear()
+    for key in list(st.session_state.keys()):
+        del st.session_state[key]
 
-    def is_game_over(self):
-        hit = any(p.score >= self.target_score for p in self.players)
-        same = len({p.rounds_played for p in self.players}) == 1
-        return hit and same
+resume_session()
 
-    def get_winner(self):
-        max_s = max(p.score for p in self.players)
-        tops = [p for p in self.players if p.score == max_s]
-        return tops if len(tops) > 1 else tops[0]
 
 # ==================== UI ====================
 if "game" not in st.session_state:
@@ -437,29 +258,58 @@ if "game" not in st.session_state:
             target = st.number_input("Target Score", min_value=1, value=20)
             difficulty = st.selectbox("Select Difficulty", ["Easy", "Medium", "Hard", "All Countries"])
             show_labels = st.selectbox("Show Country Names on Map?", ["Yes", "No"])
+            scoring = st.selectbox("Measure Distance To", ["Country Center", "Nearest Border"])
+            mode = st.selectbox("Mode", ["Classic", "Daily Challenge"],
+                                help=f"Daily Challenge: today's {daily.DAILY_ROUNDS} rounds, the same for everyone. "
+                                     "Single player (the first name), no target score, distance to the center. "
+                                     "Only your first completed run of the day counts.")
 
             if st.form_submit_button("Start Game"):
                 pl = [n.strip() for n in names.split(",") if n.strip()]
-                cnt = fetch_countries_by_population(difficulty)
-                # Mapping für Nachbarn-Hints
-                mapping = {c["cca3"]: c["name"]["common"] for c in cnt if c.get("cca3")}
-                st.session_state.country_code_mapping = mapping
+                countries = catalog.countries()
                 st.session_state.difficulty = difficulty
                 st.session_state.show_labels = show_labels
-                st.session_state.game = Game(pl, target, cnt)
-                st.rerun()
+                if mode == "Daily Challenge":
+                    day = st.session_state.daily = daily.today()
+                    if start_session(lambda ev: daily.daily_game(load_daily_challenge(day), difficulty,
+                                                                 pl[0] if pl else "Player", countries,
+                                                                 catalog.code_to_name(), events=ev)):
+                        rerun()
+                    del st.session_state.daily
+                    st.error("Today's challenge doesn't match the current country data, try Classic.")
+                else:
+                    ids = fetch_country_ids(difficulty)
+                    start_session(lambda ev: Game(pl, target, countries, ids=ids, code_to_name=catalog.code_to_name(),
+                                                 scoring="edge" if scoring == "Nearest Border" else "centroid",
+                                                 events=ev))
+                    load_flag_cache().prefetch([countries[i] for i in ids])  # background, for hint 3
+                    rerun()
 
     with right_col:
         display_leaderboard_top5()
+        display_daily_top5()
 
 
 
 if "game" in st.session_state:
+    # Geo/map stack is only imported once a game is running
+    from map_view import display_interactive_map, display_previous_attempts
+
     game = st.session_state.game
+    save_session()  # moves end in st.rerun(), so they are saved here
 
     if game.is_game_over():
-        if st.session_state.get("difficulty") == "All Countries":
-            update_leaderboard_accuracy(game.players)
+        # Record once per game, not on every rerun of the results screen
+        if not st.session_state.get("leaderboard_saved"):
+            if st.session_state.get("daily"):
+                update_daily_leaderboard(game.players)
+                st.session_state.leaderboard_saved = True
+            elif st.session_state.get("difficulty") == "All Countries":
+                update_leaderboard_accuracy(game.players)
+                st.session_state.leaderboard_saved = True
+            # The flag must reach the store before st.stop(): a reload
+            # resumes from it and would otherwise count the game again
+            save_session()
 
         players = sorted(game.players, key=lambda p: p.score, reverse=True)
         data = []
@@ -502,44 +352,39 @@ if "game" in st.session_state:
         _, center, _ = st.columns([1, 2, 1])
         with center:
             if st.button("🔁 Start New Game"):
-                for key in list(st.session_state.keys()):
-                    del st.session_state[key]
-                st.rerun()
+                end_session()
+                rerun()
 
+        metrics.end_run()
         st.stop()
 
 # ─────────────────────────────────────────────────────────────────────────────
 
     player = game.get_current_player()
+    precomputed = daily_round(game)  # daily challenge: the round's bundled data
 
 
     left_col, right_col = st.columns([1.5, 2.2], gap="large")
 
     with right_col:
         st.markdown("### 🗺️ Just click on the map to guess the country location!")
-        display_interactive_map(game.country, game)
+        display_interactive_map(game.country, game, outline=precomputed["outline"] if precomputed else None)
 
         if st.button("❌ Exit Game"):
-            for key in list(st.session_state.keys()):
-                del st.session_state[key]
-            st.rerun()
+            end_session()
+            rerun()
 
         # ─── NEU: Next Round Button ───
         if game.round_over and not game.is_game_over():
             if st.button("➡️ Next Round"):
                 game.next_player()
-                game.new_round()
-                # Reset Session-State für neue Runde
-                st.session_state.guesses = []
-                st.session_state.current_country = None
-                st.session_state.last_click_processed = None
-                st.session_state.show_help_circle = False
-                st.session_state.help_button_clicked = False
-                st.session_state.help_used_this_round = 0
-                st.rerun()
+                game.new_round()  # map_view resets its UI state on the new round
+                rerun()
 
     with left_col:
         st.subheader(f"Current Turn: {player.name}")
+        if st.session_state.get("daily"):
+            st.caption(f"📅 Daily Challenge {st.session_state.daily} · Round {game.round_number}/{game.max_rounds}")
         st.markdown("**Score:** " + ", ".join(f"{p.name}: {p.score}" for p in game.players))
 
         if game.message:
@@ -553,26 +398,23 @@ if "game" in st.session_state:
 
         st.write("### Hints:")
         for i in range(1, game.hint_index + 1):
-            h = get_hint(game.country, i)
+            h = precomputed["hints"][i - 1] if precomputed else game.get_hint(i)
             if i == 3 and h.startswith("http"):
                 st.write("**Hint 3: Flag**")
-                st.image(h, width=150)
+                # Bundled with the daily challenge, else the local pre-resized
+                # copy if prefetched, else the remote URL
+                if precomputed and precomputed["flag"]:
+                    st.image(base64.b64decode(precomputed["flag"]), width=150)
+                else:
+                    st.image(load_flag_cache().get(game.country) or h, width=150)
             else:
                 st.markdown(f"**Hint {i}:** {h}")
 
-        if st.session_state.guesses:
-            st.markdown("### Your previous attempts:")
-            correct = get_centroid_coords(game.country['name']['common'])
-            row = world_gdf[world_gdf['name_lower'] == game.country['name']['common'].lower()]
-            if correct and not row.empty:
-                geom = row.iloc[0]['geometry']
-                for i, (lat_i, lon_i) in enumerate(st.session_state.guesses):
-                    point = Point(lon_i, lat_i)
-                    if geom.contains(point):
-                        st.write(f"Attempt {i+1}: 🎯 Correct Hit!")
-                    else:
-                        dist = geodesic((lat_i, lon_i), tuple(correct)).kilometers
-                        st.write(f"Attempt {i+1}: {int(dist)} km away")
+        if game.guesses:
+            display_previous_attempts(game)
+
+    save_session()  # in-run changes (e.g. the help circle)
 
+metrics.end_run()
 
 # to run the code: streamlit run project.py
\ No newline at end of file
@@ -0,0 +1,135 @@
+# ==================== Data Refresh ====================
+# Background refresh of the country catalog and the flag cache.
+# One asyncio run per refresh: the catalog and all flags are fetched
+# concurrently over a pooled requests.Session (blocking calls run in worker
+# threads), with retries + exponential backoff and conditional requests
+# (If-None-Match / If-Modified-Since), so unchanged data costs a 304.
+# A new catalog is swapped into the running process atomically.
+
+import asyncio
+import os
+import random
+import threading
+import time
+
+import catalog
+from flags import flag_url
+
+REFRESH_INTERVAL = 24 * 60 * 60  # seconds
+CONCURRENCY = 16
+RETRIES = 3
+BACKOFF = 0.5  # seconds, doubled per retry
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+_refresher = None
+_refresher_lock = threading.Lock()
+
+
+def _session(pool_size=CONCURRENCY):
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _conditional_headers(meta):
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    return headers
+
+
+async def _get(session, url, headers=None, params=None, timeout=10):
+    delay = BACKOFF
+    for attempt in range(RETRIES + 1):
+        last = attempt == RETRIES
+        try:
+            r = await asyncio.to_thread(session.get, url, headers=headers, params=params, timeout=timeout)
+        except OSError:  # requests' connection errors are OSErrors
+            if last:
+                raise
+        else:
+            if r.status_code not in RETRY_STATUS or last:
+                r.raise_for_status()
+                return r
+        await asyncio.sleep(delay * (0.5 + random.random()))
+        delay *= 2
+
+
+async def refresh_catalog(session):
+    # -> (catalog, changed)
+    current = catalog.load_catalog()
+    # an older snapshot lacks fields: fetch in full, not conditionally
+    headers = _conditional_headers(current) if current.get("version") == catalog.CATALOG_VERSION else {}
+    r = await _get(session, catalog.CATALOG_URL, headers=headers,
+                   params={"fields": ",".join(catalog.CATALOG_FIELDS)})
+    if r.status_code == 304:
+        return current, False
+    new = catalog.make_catalog(r.json(), r.headers.get("ETag"), r.headers.get("Last-Modified"))
+    await asyncio.to_thread(catalog.install_catalog, new)
+    return new, True
+
+
+async def refresh_flags(session, flag_cache, countries):
+    # -> number of flags (re)downloaded
+    sem = asyncio.Semaphore(CONCURRENCY)
+
+    async def one(country):
+        code, url = country.get("cca3"), flag_url(country)
+        if not code or not url.endswith(".png"):
+            return False
+        meta = flag_cache.meta.get(code, {})
+        cached = meta.get("url") == url and os.path.exists(flag_cache.path(code))
+        async with sem:
+            try:
+                r = await _get(session, url, headers=_conditional_headers(meta) if cached else None)
+            except (OSError, ValueError):
+                return False
+        if r.status_code == 304:
+            return False
+        try:
+            await asyncio.to_thread(flag_cache.store, code, r.content, {
+                "url": url, "etag": r.headers.get("ETag"), "last_modified": r.headers.get("Last-Modified")})
+        except OSError:  # not an image PIL can read
+            return False
+        return True
+
+    results = await asyncio.gather(*(one(c) for c in countries))
+    await asyncio.to_thread(flag_cache.save_meta)
+    return sum(results)
+
+
+async def refresh_all(flag_cache=None):
+    # Catalog and flags concurrently; flags use the catalog currently loaded
+    session = _session()
+    try:
+        tasks = [refresh_catalog(session)]
+        if flag_cache is not None:
+            tasks.append(refresh_flags(session, flag_cache, catalog.load_catalog()["countries"]))
+        return await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        session.close()
+
+
+def _refresh_loop(flag_cache, interval):
+    age = time.time() - catalog.load_catalog().get("built", 0)
+    time.sleep(max(interval - age, 60))
+    while True:
+        asyncio.run(refresh_all(flag_cache))  # errors keep the old snapshot
+        time.sleep(interval)
+
+
+def start_background_refresh(flag_cache=None, interval=REFRESH_INTERVAL):
+    global _refresher
+    with _refresher_lock:
+        if _refresher is None or not _refresher.is_alive():
+            _refresher = threading.Thread(target=_refresh_loop, args=(flag_cache, interval),
+                                          daemon=True, name="data-refresh")
+            _refresher.start()
+    return _refresher
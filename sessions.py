@@ -0,0 +1,153 @@
+# ==================== Session Store ====================
+# Running games persisted outside the Streamlit process: the compact game
+# state (engine.Game.to_state) is written after every move under a session
+# id kept in the page URL, and read back the first time a reconnecting
+# browser shows up on a process that doesn't have it in memory. With a
+# shared store, a restart or a failover to another replica resumes the game.
+#
+#   CG_SESSION_STORE=sqlite:///path/sessions.db   (default: ./sessions.db)
+#   CG_SESSION_STORE=redis://host:6379/0          (needs the redis package)
+#   CG_SESSION_STORE=memory://                    (in-process, for tests/dev)
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from engine import Game
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SESSION_DB_PATH = os.path.join(BASE_DIR, "sessions.db")
+SESSION_TTL = 7 * 24 * 3600  # idle games are dropped after a week
+STATE_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_expires ON sessions(expires);
+"""
+
+
+# ==================== Backends ====================
+# All stores map a session id to a JSON string: get / put / delete.
+class SQLiteSessionStore:
+    def __init__(self, path=SESSION_DB_PATH, ttl=SESSION_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        conn = self._conn()
+        with conn:
+            conn.executescript(SCHEMA)
+        self.purge()
+
+    def _conn(self):
+        # one connection per thread, as in leaderboard.py
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, sid):
+        row = self._conn().execute(
+            "SELECT state FROM sessions WHERE id = ? AND expires > ?", (sid, time.time())
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def put(self, sid, state):
+        self._conn().execute(
+            "INSERT INTO sessions (id, state, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET state = excluded.state, expires = excluded.expires",
+            (sid, state, time.time() + self.ttl),
+        )
+
+    def delete(self, sid):
+        self._conn().execute("DELETE FROM sessions WHERE id = ?", (sid,))
+
+    def purge(self):
+        self._conn().execute("DELETE FROM sessions WHERE expires <= ?", (time.time(),))
+
+
+class MemoryRedis:
+    # In-process stand-in for the few redis-py client calls used below
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return None
+            if hit[1] is not None and hit[1] <= time.monotonic():
+                del self._data[key]
+                return None
+            return hit[0]
+
+    def set(self, key, value, ex=None):
+        if isinstance(value, str):
+            value = value.encode()
+        with self._lock:
+            self._data[key] = (value, None if ex is None else time.monotonic() + ex)
+        return True
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(self._data.pop(k, None) is not None for k in keys)
+
+
+class RedisSessionStore:
+    # Any client with redis-py's get/set(ex=)/delete: redis.Redis or MemoryRedis
+    def __init__(self, client, ttl=SESSION_TTL, prefix="country_guesser:session:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, sid):
+        raw = self.client.get(self.prefix + sid)
+        return None if raw is None else raw.decode()
+
+    def put(self, sid, state):
+        self.client.set(self.prefix + sid, state, ex=self.ttl)
+
+    def delete(self, sid):
+        self.client.delete(self.prefix + sid)
+
+
+def open_store(url=None):
+    url = url or os.environ.get("CG_SESSION_STORE") or f"sqlite:///{SESSION_DB_PATH}"
+    if url.startswith("sqlite:///"):
+        return SQLiteSessionStore(url[len("sqlite:///"):])
+    if url == "memory://":
+        return RedisSessionStore(MemoryRedis())
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        import redis
+
+        return RedisSessionStore(redis.Redis.from_url(url))
+    raise ValueError(f"unsupported session store {url!r}")
+
+
+# ==================== Game State ====================
+def dump(game, ui=None):
+    # ui: the few per-session settings that live next to the game
+    return json.dumps({"v": STATE_VERSION, "game": game.to_state(), "ui": ui or {}}, separators=(",", ":"))
+
+
+def load(blob, countries, code_to_name=None):
+    # (game, ui) or None if missing, from another version or no longer
+    # playable against this catalog
+    if blob is None:
+        return None
+    try:
+        data = json.loads(blob)
+        if data.get("v") != STATE_VERSION:
+            return None
+        return Game.from_state(data["game"], countries, code_to_name), data.get("ui", {})
+    except (ValueError, KeyError, TypeError, IndexError):
+        return None
@@ -0,0 +1,90 @@
+# distance.py against geopy's geodesic (Karney), to within 1 mm.
+# Run from the repo root:  python -m pytest tests
+
+import numpy as np
+import pytest
+from geopy.distance import geodesic
+
+import distance
+
+TOLERANCE_KM = 1e-6  # 1 mm
+
+
+def _reference(lats1, lons1, lats2, lons2):
+    return np.array([geodesic((a, b), (c, d)).km for a, b, c, d in zip(lats1, lons1, lats2, lons2)])
+
+
+def _random_points(n, seed):
+    rng = np.random.default_rng(seed)
+    return np.degrees(np.arcsin(rng.uniform(-1, 1, n))), rng.uniform(-180, 180, n)
+
+
+def _pairs():
+    # (lat1, lon1, lat2, lon2) arrays of each kind of pair
+    lats, lons = _random_points(500, seed=0)
+    tlats, tlons = _random_points(500, seed=1)
+    rng = np.random.default_rng(2)
+    near = rng.uniform(0.01, 0.5, 50)  # degrees off antipodal: Vincenty fails, Karney fallback
+    alats, alons = lats[:50], lons[:50]
+    elons = rng.uniform(-180, 180, 50)
+    return {
+        "random": (lats, lons, tlats, tlons),
+        "near-antipodal": (alats, alons, -alats + near, (alons + 180 - near + 180) % 360 - 180),
+        "antipodal equator": (np.zeros(3), np.array([0.0, 10.0, -170.0]), np.zeros(3), np.array([180.0, -170.0, 10.0])),
+        "coincident": (lats[:50], lons[:50], lats[:50], lons[:50]),
+        "equatorial": (np.zeros(50), elons, np.zeros(50), rng.uniform(-180, 180, 50)),
+    }
+
+
+@pytest.mark.parametrize("kind", list(_pairs()))
+def test_vincenty_km_matches_geopy(kind):
+    a, b, c, d = _pairs()[kind]
+    err = np.abs(distance.vincenty_km(a, b, c, d) - _reference(a, b, c, d))
+    assert err.max() < TOLERANCE_KM
+
+
+@pytest.mark.parametrize("kind", list(_pairs()))
+def test_vincenty_km_scalar_matches_geopy(kind):
+    a, b, c, d = _pairs()[kind]
+    got = np.array([distance.vincenty_km_scalar(*p) for p in zip(a.tolist(), b.tolist(), c.tolist(), d.tolist())])
+    assert np.abs(got - _reference(a, b, c, d)).max() < TOLERANCE_KM
+
+
+def test_vincenty_km_broadcasts_tables():
+    # (n, 1) guesses vs (m,) targets -> n x m, as pairwise_km uses it
+    lats, lons = _random_points(7, seed=3)
+    tlats, tlons = _random_points(5, seed=4)
+    table = distance.vincenty_km(lats[:, None], lons[:, None], tlats, tlons)
+    assert table.shape == (7, 5)
+    ref = np.array([[geodesic((a, b), (c, d)).km for c, d in zip(tlats, tlons)] for a, b in zip(lats, lons)])
+    assert np.abs(table - ref).max() < TOLERANCE_KM
+    assert np.array_equal(distance.pairwise_km(lats, lons, tlats, tlons), table)
+
+
+def test_vincenty_km_scalar_inputs():
+    # one guess against one target keeps the scalar shape
+    d = distance.vincenty_km(52.52, 13.40, 48.86, 2.35)
+    assert d.shape == ()
+    assert abs(float(d) - geodesic((52.52, 13.40), (48.86, 2.35)).km) < TOLERANCE_KM
+
+
+def test_lambert_km_close_to_geopy():
+    # Lambert's formula: the cheap ellipsoidal distance behind edge_km,
+    # ~1 m up to a few hundred km, Vincenty near antipodal points
+    lats, lons = _random_points(300, seed=5)
+    rng = np.random.default_rng(6)
+    tlats = np.clip(lats + rng.uniform(-4, 4, 300), -90, 90)
+    tlons = lons + rng.uniform(-4, 4, 300)
+    err = np.abs(distance.lambert_km(lats, lons, tlats, tlons) - _reference(lats, lons, tlats, tlons))
+    assert err.max() < 2e-3
+    for kind in ("random", "antipodal equator", "coincident"):
+        a, b, c, d = _pairs()[kind]
+        ref = _reference(a, b, c, d)
+        assert np.abs(distance.lambert_km(a, b, c, d) - ref).max() < max(ref.max() * 5e-5, TOLERANCE_KM)
+
+
+def test_lambert_km_scalar_matches_vectorized():
+    a, b, c, d = _pairs()["random"]
+    got = [distance.lambert_km_scalar(*p) for p in zip(a.tolist(), b.tolist(), c.tolist(), d.tolist())]
+    assert np.allclose(got, distance.lambert_km(a, b, c, d), rtol=0, atol=TOLERANCE_KM)
+    assert distance.lambert_km_scalar(0.0, 10.0, 0.0, -170.0) == distance.vincenty_km_scalar(0.0, 10.0, 0.0, -170.0)
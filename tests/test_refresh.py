@@ -0,0 +1,99 @@
+# Refresh pipeline (refresh.py) against a local stub server, no network.
+# Run from the repo root:  python -m pytest tests
+
+import asyncio
+import functools
+import io
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from PIL import Image
+
+import catalog
+import refresh
+from flags import FlagCache
+
+PAYLOAD = [{"name": {"common": "Testland", "official": "Republic of Testland"}, "cca3": "TST"}]
+
+
+def _png():
+    buf = io.BytesIO()
+    Image.new("RGB", (640, 320), "red").save(buf, format="PNG")
+    return buf.getvalue()
+
+
+@pytest.fixture
+def stub():
+    # /all: 503 once, then the payload with ETag "v1"; /flag.png: ETag "f1".
+    # Both answer 304 to a matching If-None-Match.
+    state = {"requests": [], "fail": 1}
+    png = _png()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            state["requests"].append((path, self.headers.get("If-None-Match")))
+            if path == "/all" and state["fail"]:
+                state["fail"] -= 1
+                self.send_error(503)
+                return
+            etag, body, ctype = {"/all": ("v1", json.dumps(PAYLOAD).encode(), "application/json"),
+                                 "/flag.png": ("f1", png, "image/png")}[path]
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    state["url"] = f"http://127.0.0.1:{server.server_port}"
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def session(stub, tmp_path, monkeypatch):
+    # Catalog snapshot and install path redirected to tmp_path
+    monkeypatch.setattr(refresh, "BACKOFF", 0.01)
+    monkeypatch.setattr(catalog, "CATALOG_URL", stub["url"] + "/all")
+    monkeypatch.setattr(catalog, "_catalog", {"version": catalog.CATALOG_VERSION, "built": 0, "countries": []})
+    monkeypatch.setattr(catalog, "install_catalog",
+                        functools.partial(catalog.install_catalog, path=str(tmp_path / "countries.json")))
+    s = refresh._session()
+    yield s
+    s.close()
+
+
+def test_catalog_retries_then_revalidates(stub, session):
+    new, changed = asyncio.run(refresh.refresh_catalog(session))
+    assert changed and new["etag"] == "v1"
+    assert [c["cca3"] for c in catalog.load_catalog()["countries"]] == ["TST"]
+    assert stub["requests"] == [("/all", None), ("/all", None)]  # 503, then 200
+
+    same, changed = asyncio.run(refresh.refresh_catalog(session))
+    assert not changed and same is new
+    assert stub["requests"][-1] == ("/all", "v1")  # answered 304
+
+
+def test_flags_stored_then_not_modified(stub, session, tmp_path):
+    flags = FlagCache(str(tmp_path / "flags"))
+    countries = [{"cca3": "TST", "flags": {"png": stub["url"] + "/flag.png"}}]
+
+    assert asyncio.run(refresh.refresh_flags(session, flags, countries)) == 1
+    assert Image.open(flags.path("TST")).size == (flags.width, flags.width // 2)
+    assert flags.meta["TST"]["etag"] == "f1"
+
+    assert asyncio.run(refresh.refresh_flags(session, flags, countries)) == 0
+    assert stub["requests"][-1] == ("/flag.png", "f1")
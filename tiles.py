@@ -0,0 +1,256 @@
+# ==================== Vector Tiles ====================
+# Mapbox Vector Tiles (MVT) of the country polygons, so the map can reveal
+# outlines at any zoom without shipping GeoJSON in every map payload.
+# Tiles are rendered from the world geometry, cached on disk under
+# data/tiles/{z}/{x}/{y}.pbf and served by a small local HTTP endpoint.
+#
+#   python tiles.py build [maxzoom]   # precompute the tile cache
+#   python tiles.py serve [port]      # serve /tiles/{z}/{x}/{y}.pbf
+#                                     # (and /world.geojson for the globe)
+#
+# The MVT protobuf is encoded by hand (one layer, polygon features only),
+# which avoids a dependency for the ~100 lines it takes.
+
+import json
+import math
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import shapely
+
+TILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "tiles")
+LAYER_NAME = "countries"
+EXTENT = 4096
+BUFFER = 64  # tile units outside the tile kept to avoid seams
+MAX_ZOOM = 5  # same as the folium map
+MAX_LAT = 85.0511287798
+
+
+# ---------- protobuf encoding ----------
+def _varint(n):
+    out = bytearray()
+    while True:
+        b = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(b | 0x80)
+        else:
+            out.append(b)
+            return bytes(out)
+
+
+def _zigzag(n):
+    return (n << 1) ^ (n >> 31)
+
+
+def _key(field, wire):
+    return _varint((field << 3) | wire)
+
+
+def _bytes_field(field, payload):
+    return _key(field, 2) + _varint(len(payload)) + payload
+
+
+def _varint_field(field, value):
+    return _key(field, 0) + _varint(value)
+
+
+def _packed_field(field, values):
+    return _bytes_field(field, b"".join(_varint(v) for v in values))
+
+
+# ---------- geometry ----------
+def tile_bounds(z, x, y):
+    # (west, south, east, north) in degrees
+    n = 2 ** z
+    lat = lambda t: math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * t / n))))
+    return x / n * 360.0 - 180.0, lat(y + 1), (x + 1) / n * 360.0 - 180.0, lat(y)
+
+
+def _to_tile(z, x, y):
+    n = 2 ** z
+
+    def transform(coords):
+        lon = coords[:, 0]
+        lat = np.radians(np.clip(coords[:, 1], -MAX_LAT, MAX_LAT))
+        mx = (lon + 180.0) / 360.0
+        my = (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / math.pi) / 2.0
+        return np.column_stack([(mx * n - x) * EXTENT, (my * n - y) * EXTENT])
+    return transform
+
+
+def _ring_commands(coords, exterior, cursor):
+    # MoveTo + LineTo* + ClosePath for one ring; exterior rings need a positive
+    # surveyor's-formula area in tile coordinates (clockwise with y down)
+    pts = np.asarray(coords, dtype=np.int64)[:-1]
+    if len(pts) < 3:
+        return []
+    area = np.sum(pts[:, 0] * np.roll(pts[:, 1], -1) - np.roll(pts[:, 0], -1) * pts[:, 1])
+    if area == 0:
+        return []
+    if (area > 0) != exterior:
+        pts = pts[::-1]
+    deltas = np.diff(np.vstack([cursor, pts]), axis=0)
+    cursor[:] = pts[-1]
+    cmds = [(1 & 0x7) | (1 << 3), _zigzag(int(deltas[0, 0])), _zigzag(int(deltas[0, 1]))]
+    cmds.append((2 & 0x7) | ((len(pts) - 1) << 3))
+    for dx, dy in deltas[1:].tolist():
+        cmds += [_zigzag(dx), _zigzag(dy)]
+    cmds.append((7 & 0x7) | (1 << 3))
+    return cmds
+
+
+def _polygonal(geom):
+    # only the polygon parts of a (possibly mixed) collection
+    parts = [p for part in shapely.get_parts(geom) for p in shapely.get_parts(part)]
+    return shapely.MultiPolygon([p for p in parts if p.geom_type == "Polygon"])
+
+
+def _polygon_commands(geom):
+    cmds, cursor = [], np.zeros(2, dtype=np.int64)
+    for poly in shapely.get_parts(geom):
+        if poly.geom_type != "Polygon":
+            continue
+        outer = _ring_commands(poly.exterior.coords, True, cursor)
+        if not outer:
+            continue
+        cmds += outer
+        for ring in poly.interiors:
+            cmds += _ring_commands(ring.coords, False, cursor)
+    return cmds
+
+
+def render_tile(locator, z, x, y):
+    west, south, east, north = tile_bounds(z, x, y)
+    pad_x, pad_y = (east - west) * BUFFER / EXTENT, (north - south) * BUFFER / EXTENT
+    rows = locator.tree.query(shapely.box(west - pad_x, south - pad_y, east + pad_x, north + pad_y))
+    transform = _to_tile(z, x, y)
+
+    keys, values, value_index, features = ["name", "code"], [], {}, []
+    for i in sorted(rows.tolist()):
+        geom = shapely.transform(locator.geometries[i], transform)
+        geom = shapely.clip_by_rect(geom, -BUFFER, -BUFFER, EXTENT + BUFFER, EXTENT + BUFFER)
+        # clipping and simplifying can leave invalid rings; repair before
+        # snapping to the integer tile grid
+        geom = shapely.set_precision(_polygonal(shapely.make_valid(shapely.simplify(geom, 4))), 1.0)
+        cmds = _polygon_commands(geom)
+        if not cmds:
+            continue
+        tags = []
+        for k, v in enumerate((locator.names[i], locator.codes[i] or "")):
+            if v not in value_index:
+                value_index[v] = len(values)
+                values.append(v)
+            tags += [k, value_index[v]]
+        features.append(_bytes_field(2, _varint_field(1, i + 1) + _packed_field(2, tags)
+                                     + _varint_field(3, 3) + _packed_field(4, cmds)))
+    if not features:
+        return b""
+
+    layer = _varint_field(15, 2) + _bytes_field(1, LAYER_NAME.encode())
+    layer += b"".join(features)
+    layer += b"".join(_bytes_field(3, k.encode()) for k in keys)
+    layer += b"".join(_bytes_field(4, _bytes_field(1, v.encode())) for v in values)
+    layer += _varint_field(5, EXTENT)
+    return _bytes_field(3, layer)
+
+
+# ---------- disk cache ----------
+class TileCache:
+    def __init__(self, locator, directory=TILE_DIR, max_zoom=MAX_ZOOM):
+        self.locator = locator
+        self.directory = directory
+        self.max_zoom = max_zoom
+        self._documents = {}
+
+    def path(self, z, x, y):
+        return os.path.join(self.directory, str(z), str(x), f"{y}.pbf")
+
+    def get(self, z, x, y):
+        if not (0 <= z <= self.max_zoom and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            return None
+        path = self.path(z, x, y)
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            pass
+        data = render_tile(self.locator, z, x, y)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return data
+
+    def world_geojson(self, tol=0.25):
+        # All outlines in one GeoJSON document, for the globe (Text_map.py)
+        key = ("world", tol)
+        if key not in self._documents:
+            self._documents[key] = json.dumps(self.locator.world_geojson(tol), separators=(",", ":")).encode()
+        return self._documents[key]
+
+    def build(self, max_zoom=None):
+        count = 0
+        for z in range((max_zoom if max_zoom is not None else self.max_zoom) + 1):
+            for x in range(2 ** z):
+                for y in range(2 ** z):
+                    self.get(z, x, y)
+                    count += 1
+        return count
+
+
+# ---------- endpoint ----------
+def serve_tiles(cache, host="127.0.0.1", port=8765):
+    # Starts a daemon HTTP server for /tiles/{z}/{x}/{y}.pbf and
+    # /world.geojson, returns it
+    class TileHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            parts = self.path.split("?")[0].strip("/").split("/")
+            ctype = "application/x-protobuf"
+            try:
+                if parts == ["world.geojson"]:
+                    data, ctype = cache.world_geojson(), "application/geo+json"
+                elif len(parts) != 4 or parts[0] != "tiles" or not parts[3].endswith(".pbf"):
+                    raise ValueError
+                else:
+                    data = cache.get(int(parts[1]), int(parts[2]), int(parts[3][:-4]))
+            except ValueError:
+                data = None
+            if data is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(data)))
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.send_header("Cache-Control", "public, max-age=86400")
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), TileHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="tile-server").start()
+    return server
+
+
+if __name__ == "__main__":
+    import geo
+
+    cache = TileCache(geo.load_locator())
+    if sys.argv[1:2] == ["build"]:
+        n = cache.build(int(sys.argv[2]) if len(sys.argv) > 2 else None)
+        print(f"Wrote {n} tiles to {cache.directory}")
+    elif sys.argv[1:2] == ["serve"]:
+        port = int(sys.argv[2]) if len(sys.argv) > 2 else 8765
+        server = serve_tiles(cache, port=port)
+        print(f"Serving tiles on http://127.0.0.1:{port}/tiles/{{z}}/{{x}}/{{y}}.pbf")
+        threading.Event().wait()
+    else:
+        print("usage: python tiles.py build [maxzoom] | serve [port]")